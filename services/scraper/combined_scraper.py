@@ -4,7 +4,7 @@ Combined Scraper - Fetches from all stores and merges data
 import json
 import hashlib
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from typing import Optional, List
 import sys
 import os
@@ -27,6 +27,13 @@ class Product:
     image_url: Optional[str]
     scraped_at: str
 
+_PRODUCT_FIELDS = tuple(f.name for f in fields(Product))
+
+def _product_to_dict(p: Product) -> dict:
+    """Flat dict of a Product (cheaper than asdict, which deep-copies every value)"""
+    d = p.__dict__
+    return {k: d[k] for k in _PRODUCT_FIELDS}
+
 def generate_id(store: str, name: str) -> str:
     """Generate unique ID from store + name"""
     key = f"{store}:{name}".lower()
@@ -140,7 +147,7 @@ if __name__ == "__main__":
     print(f"\n✅ Total: {len(products)} products")
     
     # Save combined data
-    output = [asdict(p) for p in products]
+    output = [_product_to_dict(p) for p in products]
     with open('data/all_products.json', 'w', encoding='utf-8') as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
     
@@ -1,5 +1,7 @@
 # Core scraping infrastructure
-from .rate_limiter import AdaptiveRateLimiter, DomainRateLimiter
+from .rate_limiter import (
+    AdaptiveRateLimiter, DomainRateLimiter, TokenBucketRateLimiter, TokenBucketDomainRateLimiter,
+)
 from .circuit_breaker import CircuitBreaker, CircuitState
 from .session_manager import SessionManager
 from .health_monitor import HealthMonitor, HealthStatus
@@ -9,6 +11,8 @@ from .orchestrator import ScraperOrchestrator
 __all__ = [
     'AdaptiveRateLimiter',
     'DomainRateLimiter', 
+    'TokenBucketRateLimiter',
+    'TokenBucketDomainRateLimiter',
     'CircuitBreaker',
     'CircuitState',
     'SessionManager',
@@ -6,6 +6,8 @@ Features:
 - Gradual recovery on success
 - Per-domain rate tracking
 - Human-like timing with jitter
+- Optional token-bucket pacing that allows short bursts
+- Non-blocking slot reservation (reserve) for asyncio callers
 """
 
 import time
@@ -60,11 +62,11 @@ class AdaptiveRateLimiter:
         self.last_request_time = 0
         self._lock = Lock()
     
-    def wait(self) -> float:
+    def reserve(self) -> float:
         """
-        Wait appropriate time before next request.
-        Returns actual wait time.
-        Thread-safe: calculates wait time under lock, sleeps outside.
+        Claim the next request slot without sleeping.
+        Returns how long the caller must wait before sending (async callers
+        await this instead of blocking in wait()).
         """
         with self._lock:
             now = time.time()
@@ -77,6 +79,16 @@ class AdaptiveRateLimiter:
             # Pre-update last_request_time to include planned wait
             self.last_request_time = now + wait_time
         
+        return wait_time
+    
+    def wait(self) -> float:
+        """
+        Wait appropriate time before next request.
+        Returns actual wait time.
+        Thread-safe: calculates wait time under lock, sleeps outside.
+        """
+        wait_time = self.reserve()
+        
         # Sleep OUTSIDE lock to avoid blocking other threads
         if wait_time > 0:
             time.sleep(wait_time)
@@ -137,6 +149,79 @@ class AdaptiveRateLimiter:
         }
 
 
+class TokenBucketRateLimiter:
+    """
+    Token-bucket limiter: averages `rate` requests/second but lets up to
+    `capacity` requests through back-to-back after an idle period.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.consecutive_failures = 0
+        self._lock = Lock()
+    
+    def reserve(self) -> float:
+        """
+        Take a token without sleeping.
+        Returns how long the caller must wait before sending.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            
+            # Going negative reserves a future token, so concurrent callers queue up
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+    
+    def wait(self) -> float:
+        """
+        Take a token, waiting for one to accrue if the bucket is empty.
+        Returns actual wait time.
+        Thread-safe: the token is reserved under lock, sleeps outside.
+        """
+        wait_time = self.reserve()
+        
+        if wait_time > 0:
+            time.sleep(wait_time)
+        
+        return wait_time
+    
+    def report_success(self, response_time: Optional[float] = None):
+        """Call after successful request"""
+        with self._lock:
+            self.consecutive_failures = 0
+    
+    def report_failure(self, status_code: Optional[int] = None):
+        """Call after failed request - drops any saved-up burst"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self.tokens = min(self.tokens, 0.0)
+            if status_code == 429:
+                logger.warning("Rate limit hit (429), draining token bucket")
+    
+    def reset(self):
+        """Reset to a full bucket"""
+        with self._lock:
+            self.tokens = self.capacity
+            self.last_refill = time.monotonic()
+            self.consecutive_failures = 0
+    
+    @property
+    def status(self) -> Dict:
+        """Current rate limiter status"""
+        return {
+            'tokens': self.tokens,
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'consecutive_failures': self.consecutive_failures,
+            'is_throttled': self.tokens < 1,
+        }
+
+
 class DomainRateLimiter:
     """
     Manages rate limiting across multiple domains.
@@ -166,16 +251,22 @@ class DomainRateLimiter:
         parsed = urlparse(url)
         return parsed.netloc.lower()
     
+    def _new_limiter(self, config: RateLimitConfig) -> AdaptiveRateLimiter:
+        """Build the limiter used for a newly seen domain"""
+        return AdaptiveRateLimiter(
+            initial_delay=60.0 / config.requests_per_minute,
+            min_delay=config.min_delay,
+            max_delay=config.max_delay,
+        )
+    
     def _get_limiter(self, domain: str) -> AdaptiveRateLimiter:
         """Get or create limiter for domain"""
         if domain not in self.domain_limiters:
-            config = self.DEFAULT_CONFIGS.get(domain, self.default_config)
-            self.domain_limiters[domain] = AdaptiveRateLimiter(
-                initial_delay=60.0 / config.requests_per_minute,
-                min_delay=config.min_delay,
-                max_delay=config.max_delay,
-            )
-            self.request_history[domain] = deque(maxlen=100)
+            with self._lock:
+                if domain not in self.domain_limiters:
+                    config = self.DEFAULT_CONFIGS.get(domain, self.default_config)
+                    self.request_history[domain] = deque(maxlen=100)
+                    self.domain_limiters[domain] = self._new_limiter(config)
         return self.domain_limiters[domain]
     
     def wait(self, url: str) -> float:
@@ -190,6 +281,17 @@ class DomainRateLimiter:
         
         return wait_time
     
+    def reserve(self, url: str) -> float:
+        """Claim a slot for a request to URL; returns the wait (for asyncio.sleep) instead of sleeping"""
+        domain = self._get_domain(url)
+        wait_time = self._get_limiter(domain).reserve()
+        
+        # Track request time (when it will actually go out)
+        with self._lock:
+            self.request_history[domain].append(time.time() + wait_time)
+        
+        return wait_time
+    
     def report_success(self, url: str, response_time: Optional[float] = None):
         """Report successful request"""
         domain = self._get_domain(url)
@@ -221,5 +323,18 @@ class DomainRateLimiter:
         }
 
 
+class TokenBucketDomainRateLimiter(DomainRateLimiter):
+    """
+    DomainRateLimiter whose per-domain limiters are token buckets:
+    requests_per_minute is the average rate and burst_size the bucket capacity.
+    """
+    
+    def _new_limiter(self, config: RateLimitConfig) -> TokenBucketRateLimiter:
+        return TokenBucketRateLimiter(
+            rate=config.requests_per_minute / 60.0,
+            capacity=config.burst_size,
+        )
+
+
 # Pre-configured instance for easy import
 default_rate_limiter = DomainRateLimiter()
@@ -4,11 +4,12 @@ Retry Logic with Exponential Backoff and Jitter
 Implements intelligent retry strategies for transient failures.
 """
 
+import asyncio
 import time
 import random
 import logging
 from functools import wraps
-from typing import Optional, Callable, Any, Tuple, Type, Union
+from typing import Optional, Callable, Any, Awaitable, Tuple, Type, Union
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
@@ -153,6 +154,43 @@ class RetryHandler:
                 time.sleep(delay)
         
         raise RetryExhausted(last_exception, self.config.max_attempts)
+    
+    async def execute_async(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        on_retry: Optional[Callable[[int, Exception, float], None]] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Async counterpart of execute(): awaits func and backs off with
+        asyncio.sleep, so other tasks keep running between attempts.
+        """
+        last_exception = None
+        
+        for attempt in range(self.config.max_attempts):
+            try:
+                return await func(*args, **kwargs)
+            
+            except Exception as e:
+                last_exception = e
+                
+                if not self.should_retry(exception=e, attempt=attempt):
+                    raise
+                
+                delay = self.get_delay(attempt)
+                
+                logger.warning(
+                    f"Attempt {attempt + 1}/{self.config.max_attempts} failed: {e}. "
+                    f"Retrying in {delay:.2f}s"
+                )
+                
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                
+                await asyncio.sleep(delay)
+        
+        raise RetryExhausted(last_exception, self.config.max_attempts)
 
 
 def retry_with_jitter(
@@ -131,6 +131,23 @@ class SessionConfig:
     max_age_seconds: int = 1800      # Rotate after N seconds (30 min)
     rotate_on_errors: List[int] = field(default_factory=lambda: [403, 429, 503])
     cookie_persistence: bool = True
+    pool_connections: int = 10       # Host pools kept by the shared adapter
+    pool_maxsize: int = 10           # Keep-alive connections per host pool
+    extra_headers: Dict[str, str] = field(default_factory=dict)  # Laid over the browser headers of every session
+
+
+def make_adapter(config: SessionConfig) -> HTTPAdapter:
+    """Create an HTTP adapter with the standard retry strategy"""
+    retry_strategy = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[500, 502, 503, 504],
+    )
+    return HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        max_retries=retry_strategy,
+    )
 
 
 class BrowserSession:
@@ -143,7 +160,8 @@ class BrowserSession:
         session_id: str,
         user_agent: str,
         headers: Dict[str, str],
-        config: SessionConfig
+        config: SessionConfig,
+        adapter: Optional[HTTPAdapter] = None
     ):
         self.session_id = session_id
         self.user_agent = user_agent
@@ -153,13 +171,8 @@ class BrowserSession:
         self.session = requests.Session()
         self.session.headers.update(headers)
         
-        # Configure retries
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Configure retries; a shared adapter keeps its connection pool across rotations
+        adapter = adapter or make_adapter(config)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
@@ -177,16 +190,19 @@ class BrowserSession:
             return True
         return False
     
-    def get(self, url: str, **kwargs) -> requests.Response:
-        """Make GET request"""
+    def count_request(self):
+        """Count a request towards rotation (also for ones sent by an async client)"""
         self.request_count += 1
         self.last_used = time.time()
+    
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Make GET request"""
+        self.count_request()
         return self.session.get(url, **kwargs)
     
     def post(self, url: str, **kwargs) -> requests.Response:
         """Make POST request"""
-        self.request_count += 1
-        self.last_used = time.time()
+        self.count_request()
         return self.session.post(url, **kwargs)
     
     def record_error(self, status_code: int):
@@ -223,6 +239,9 @@ class SessionManager:
         self.config = config or SessionConfig()
         
         self.sessions: Dict[str, BrowserSession] = {}
+        # One adapter per domain, mounted on every rotated session so keep-alive
+        # connections survive header/cookie rotation
+        self._adapters: Dict[str, HTTPAdapter] = {}
         self._lock = Lock()
         self._session_counter = 0
     
@@ -254,12 +273,18 @@ class SessionManager:
             headers = get_firefox_headers(user_agent)
         else:
             headers = get_safari_headers(user_agent)
+        headers.update(self.config.extra_headers)
+        
+        adapter = self._adapters.get(domain)
+        if adapter is None:
+            adapter = self._adapters[domain] = make_adapter(self.config)
         
         session = BrowserSession(
             session_id=session_id,
             user_agent=user_agent,
             headers=headers,
-            config=self.config
+            config=self.config,
+            adapter=adapter
         )
         
         # Load persisted cookies if available
@@ -16,14 +16,20 @@ import json
 import sqlite3
 import time
 import random
+import sys
 import logging
 from pathlib import Path
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field, fields
 from typing import List, Optional, Tuple, Dict, Any
 from datetime import datetime, timezone
 
 import requests
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -33,7 +39,27 @@ OFFERS_URL = "https://www.kaufland.bg/aktualni-predlozheniya/oferti.html"
 MAX_RETRIES = 3
 
 
-@dataclass
+def _json_loads(data: str) -> Any:
+    """Parse JSON with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _write_json(path: Path, data: Any) -> None:
+    """Write pretty-printed UTF-8 JSON, using orjson when available."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+# The defaults rule out a hand-written __slots__, and slots=True needs Python 3.10
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class KauflandProduct:
     kl_nr: str
     title: str
@@ -54,8 +80,11 @@ class KauflandProduct:
     scraped_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
     
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {n: getattr(self, n) for n in _FIELD_NAMES}
+
 
+# All fields are flat primitives, so a plain getattr copy replaces asdict()
+_FIELD_NAMES = tuple(f.name for f in fields(KauflandProduct))
 
 def parse_bgn_price(text: str) -> Optional[float]:
     """Parse BGN price from text like '12,38 ЛВ.'"""
@@ -218,7 +247,7 @@ class KauflandEnhancedScraper:
             array_str = html[start:end]
             
             try:
-                offers = json.loads(array_str)
+                offers = _json_loads(array_str)
                 for offer in offers:
                     klnr = offer.get('klNr')
                     if klnr and klnr not in seen_klnr:
@@ -450,8 +479,7 @@ class KauflandEnhancedScraper:
         output = output_path or self.db_path.parent / "kaufland_enhanced.json"
         output.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output, 'w', encoding='utf-8') as f:
-            json.dump([p.to_dict() for p in self.products], f, ensure_ascii=False, indent=2)
+        _write_json(output, [p.to_dict() for p in self.products])
         
         logger.info(f"Saved to {output}")
 
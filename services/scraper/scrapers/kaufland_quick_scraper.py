@@ -6,20 +6,42 @@ Simple and robust - extracts product data from Kaufland offers page.
 """
 
 import re
+import sys
 import json
 import time
 import logging
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from typing import List, Optional, Tuple
 
 import requests
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The page is scanned as raw bytes; only the matched fields are decoded.
+_KL_NR_RE_B = re.compile(rb'"klNr":"([0-9]+)"')
+
+# title/subtitle/price near a klNr, matched in a single pass over the context
+_OFFER_FIELDS_RE_B = re.compile(
+    rb'"title":"(?P<title>[^"]+)"'
+    rb'|"subtitle":"(?P<subtitle>[^"]*)"'
+    rb'|"price":(?P<price>[\d.]+)'
+)
+
+# 2000 characters of context, allowing for 2-byte Cyrillic in UTF-8
+CONTEXT_BYTES = 4000
 
-@dataclass
+# slots=True is Python 3.10+; on 3.9 products simply keep a __dict__
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class KauflandProduct:
     name: str
     kl_nr: str
@@ -31,6 +53,9 @@ class KauflandProduct:
     category: Optional[str] = None
 
 
+# All fields are flat primitives, so a plain getattr copy replaces asdict()
+_FIELD_NAMES = tuple(f.name for f in fields(KauflandProduct))
+
 def extract_size(text: str) -> Tuple[Optional[float], Optional[str]]:
     """Extract size from text like '400 г', '1.5 л', 'Ø9 см'"""
     if not text:
@@ -101,11 +126,11 @@ def scrape_kaufland_offers() -> List[KauflandProduct]:
     resp = requests.get(url, headers=headers, timeout=60)
     resp.raise_for_status()
     
-    html = resp.text
+    html = resp.content
     logger.info(f"Page size: {len(html)} bytes")
     
     # Extract product data - look for klNr, then find title/subtitle in surrounding context
-    kl_matches = list(re.finditer(r'"klNr":"([0-9]+)"', html))
+    kl_matches = list(_KL_NR_RE_B.finditer(html))
     logger.info(f"Found {len(kl_matches)} klNr entries")
     
     # Process each klNr entry and find associated data
@@ -113,22 +138,26 @@ def scrape_kaufland_offers() -> List[KauflandProduct]:
     seen = set()
     
     for m in kl_matches:
-        kl = m.group(1)
+        kl = m.group(1).decode('ascii')
         if kl in seen:
             continue
         seen.add(kl)
         
-        # Look in surrounding 2000 chars for title/subtitle/price
-        context = html[m.start():m.start()+2000]
+        # Look in surrounding context for title/subtitle/price
+        context = html[m.start():m.start() + CONTEXT_BYTES]
         
-        title_match = re.search(r'"title":"([^"]+)"', context)
-        subtitle_match = re.search(r'"subtitle":"([^"]*)"', context)
-        price_match = re.search(r'"price":([\d.]+)', context)
+        found = {}
+        for fm in _OFFER_FIELDS_RE_B.finditer(context):
+            name = fm.lastgroup
+            if name not in found:
+                found[name] = fm.group(name)
+                if len(found) == 3:
+                    break
         
-        if title_match:
-            title = title_match.group(1)
-            subtitle = subtitle_match.group(1) if subtitle_match else None
-            price = float(price_match.group(1)) if price_match else None
+        if 'title' in found:
+            title = found['title'].decode('utf-8', errors='replace')
+            subtitle = found['subtitle'].decode('utf-8', errors='replace') if 'subtitle' in found else None
+            price = float(found['price']) if 'price' in found else None
             
             # Extract size
             size_val, size_unit = extract_size(subtitle)
@@ -183,8 +212,12 @@ def main():
     # Save
     output = Path(__file__).parent.parent / "data" / "kaufland_quick.json"
     output.parent.mkdir(parents=True, exist_ok=True)
-    with open(output, 'w', encoding='utf-8') as f:
-        json.dump([asdict(p) for p in products], f, ensure_ascii=False, indent=2)
+    data = [{n: getattr(p, n) for n in _FIELD_NAMES} for p in products]
+    if orjson is not None:
+        output.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
     
     print(f"\nSaved to {output}")
 
@@ -8,11 +8,42 @@ Uses full scraping infrastructure for anti-detection.
 import re
 import json
 import time
+import asyncio
+import contextlib
 import logging
-from dataclasses import dataclass, asdict
-from typing import Optional, List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from dataclasses import dataclass, fields
+from typing import Optional, List, Dict, Tuple
 from pathlib import Path
-from bs4 import BeautifulSoup
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import etree, html as lxml_html
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # optional, lxml is used otherwise
+    LexborHTMLParser = None
+
+try:
+    import httpx
+except ImportError:  # optional, only needed for the async API
+    httpx = None
+
+try:
+    import h2  # httpx needs it for http2=True
+except ImportError:  # optional, the async client speaks HTTP/1.1 otherwise
+    h2 = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:  # optional, builtin hash() is used otherwise
+    xxhash = None
 
 # Infrastructure imports
 import sys
@@ -45,30 +76,259 @@ class KauflandProduct:
     product_url: Optional[str] = None
 
 
+_PRODUCT_FIELDS = tuple(f.name for f in fields(KauflandProduct))
+
+
+def _product_to_dict(p: KauflandProduct) -> Dict:
+    """Flat dict of a product (cheaper than asdict, which deep-copies every value)"""
+    d = p.__dict__
+    return {k: d[k] for k in _PRODUCT_FIELDS}
+
+
 # ============================================
 # Helper Functions
 # ============================================
 
+# Integer and decimal parts captured separately; tolerates spacing around the separator
+# and thousands grouped with a space, NBSP or narrow NBSP ('1 299,00 €')
+_PRICE_RE = re.compile(r'(\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+)\s*[,.]\s*(\d+)')
+_GROUP_SEP_RE = re.compile(r'[ \u00a0\u202f]')
+_DISCOUNT_RE = re.compile(r'-(\d+)%')
+# Currency marker -> currency ('1,78 €', '3,48 ЛВ.', '3,48 ЛВ./кг')
+_CURRENCY_MARKERS = (('€', 'eur'), ('ЛВ', 'bgn'))
+
+
+def name_key(name: str) -> int:
+    """64-bit dedup key for a product name (collisions are negligible at catalog size)"""
+    if xxhash is not None:
+        return xxhash.xxh64_intdigest(name.encode('utf-8'))
+    return hash(name)
+
+
 def parse_price(text: str) -> Optional[float]:
     """Extract numeric price from text like '1,78 €' or '3,48 ЛВ.'"""
     if not text:
         return None
-    match = re.search(r'([\d]+[,.][\d]+)', text.replace(' ', ''))
-    if match:
-        return float(match.group(1).replace(',', '.'))
-    return None
+    match = _PRICE_RE.search(text)
+    if not match:
+        return None
+    return float(f"{_GROUP_SEP_RE.sub('', match.group(1))}.{match.group(2)}")
+
+
+def detect_price(text: str) -> Tuple[Optional[str], Optional[float]]:
+    """Return (currency, price) for price tag text, or (None, None) if no marker."""
+    for marker, currency in _CURRENCY_MARKERS:
+        if marker in text:
+            return currency, parse_price(text)
+    return None, None
 
 
 def parse_discount(text: str) -> Optional[int]:
     """Extract discount percentage from text like '-61%'"""
     if not text:
         return None
-    match = re.search(r'-(\d+)%', text)
+    match = _DISCOUNT_RE.search(text)
     if match:
         return int(match.group(1))
     return None
 
 
+# ============================================
+# Parsing
+# ============================================
+
+def parse_products(html: str, base_url: str) -> List[KauflandProduct]:
+    """Parse products from a Kaufland offer page."""
+    if LexborHTMLParser is not None:
+        tiles = extract_tiles_lexbor(html)
+    else:
+        tiles = extract_tiles_lxml(html)
+
+    products = []
+    for tile in tiles:
+        try:
+            product = build_product(*tile, base_url)
+            if product:
+                products.append(product)
+        except Exception as e:
+            logger.debug(f"Failed to parse product: {e}")
+            continue
+
+    return products
+
+
+def extract_tiles_lexbor(html: str) -> List[tuple]:
+    """Extract raw tile fields with selectolax (Lexbor backend)."""
+    tree = LexborHTMLParser(html)
+    tiles = []
+
+    for tile in tree.css('div.k-product-tile'):
+        title_div = tile.css_first('div.k-product-tile__title')
+        if title_div is None:
+            continue
+
+        subtitle = tile.css_first('div.k-product-tile__subtitle')
+
+        pricetags = []
+        for pt in tile.css('div.k-product-tile__pricetag'):
+            price_div = pt.css_first('div.k-price-tag__price')
+            old_price_div = pt.css_first('div.k-price-tag__old-price')
+            discount_div = pt.css_first('div.k-price-tag__discount')
+            pricetags.append((
+                price_div.text(strip=True) if price_div else None,
+                old_price_div.text(strip=True) if old_price_div else None,
+                discount_div.text(strip=True) if discount_div else None,
+            ))
+
+        img = tile.css_first('img.k-product-tile__main-image')
+        image_url = None
+        if img:
+            image_url = img.attributes.get('src') or img.attributes.get('data-src')
+
+        link = tile.css_first('a.k-product-tile__link')
+        href = link.attributes.get('href') if link else None
+
+        tiles.append((
+            title_div.text(strip=True),
+            subtitle.text(strip=True) if subtitle else None,
+            pricetags,
+            image_url,
+            href,
+        ))
+
+    return tiles
+
+
+def _has_class(tag: str, cls: str) -> str:
+    """XPath step matching a tag by CSS class token"""
+    return f"{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+
+_XP_TILES = etree.XPath('//' + _has_class('div', 'k-product-tile'))
+_XP_TITLE = etree.XPath('.//' + _has_class('div', 'k-product-tile__title'))
+_XP_SUBTITLE = etree.XPath('.//' + _has_class('div', 'k-product-tile__subtitle'))
+_XP_PRICETAGS = etree.XPath('.//' + _has_class('div', 'k-product-tile__pricetag'))
+_XP_PRICE = etree.XPath('.//' + _has_class('div', 'k-price-tag__price'))
+_XP_OLD_PRICE = etree.XPath('.//' + _has_class('div', 'k-price-tag__old-price'))
+_XP_DISCOUNT = etree.XPath('.//' + _has_class('div', 'k-price-tag__discount'))
+_XP_IMAGE = etree.XPath('.//' + _has_class('img', 'k-product-tile__main-image'))
+_XP_LINK = etree.XPath('.//' + _has_class('a', 'k-product-tile__link'))
+
+
+def _lxml_text(el) -> str:
+    """Text of an element with each piece stripped and joined"""
+    return ''.join(t.strip() for t in el.itertext())
+
+
+def _first(xpath, el):
+    found = xpath(el)
+    return found[0] if found else None
+
+
+def extract_tiles_lxml(html: str) -> List[tuple]:
+    """Extract raw tile fields with lxml and compiled XPath."""
+    if not html.strip():
+        return []
+    doc = lxml_html.fromstring(html)
+    tiles = []
+
+    for tile in _XP_TILES(doc):
+        title_div = _first(_XP_TITLE, tile)
+        if title_div is None:
+            continue
+
+        subtitle = _first(_XP_SUBTITLE, tile)
+
+        pricetags = []
+        for pt in _XP_PRICETAGS(tile):
+            price_div = _first(_XP_PRICE, pt)
+            old_price_div = _first(_XP_OLD_PRICE, pt)
+            discount_div = _first(_XP_DISCOUNT, pt)
+            pricetags.append((
+                _lxml_text(price_div) if price_div is not None else None,
+                _lxml_text(old_price_div) if old_price_div is not None else None,
+                _lxml_text(discount_div) if discount_div is not None else None,
+            ))
+
+        img = _first(_XP_IMAGE, tile)
+        image_url = None
+        if img is not None:
+            image_url = img.get('src') or img.get('data-src')
+
+        link = _first(_XP_LINK, tile)
+        href = link.get('href') if link is not None else None
+
+        tiles.append((
+            _lxml_text(title_div),
+            _lxml_text(subtitle) if subtitle is not None else None,
+            pricetags,
+            image_url,
+            href,
+        ))
+
+    return tiles
+
+
+def build_product(
+    title_text: str,
+    subtitle_text: Optional[str],
+    pricetags: List[tuple],
+    image_url: Optional[str],
+    href: Optional[str],
+    base_url: str,
+) -> Optional[KauflandProduct]:
+    """Build a KauflandProduct from the raw text of one product tile."""
+    # Combine brand + description for better matching
+    if subtitle_text:
+        name = f"{title_text} {subtitle_text}".strip() if title_text else subtitle_text
+    else:
+        name = title_text
+
+    if not name or len(name) < 3:
+        return None
+
+    quantity = None  # Will parse from combined name
+
+    # Both price tags (EUR and BGN), keyed by currency
+    prices = {}
+    old_prices = {}
+    discount_pct = None
+
+    for price_text, old_price_text, discount_text in pricetags:
+        if price_text is not None:
+            currency, value = detect_price(price_text)
+            if currency:
+                prices[currency] = value
+
+        if old_price_text is not None:
+            currency, value = detect_price(old_price_text)
+            if currency:
+                old_prices[currency] = value
+
+        if discount_text is not None and not discount_pct:
+            discount_pct = parse_discount(discount_text)
+
+    # Product link
+    product_url = None
+    if href:
+        if href.startswith('/'):
+            product_url = f"{base_url}{href}"
+        else:
+            product_url = href
+
+    return KauflandProduct(
+        name=name,
+        quantity=quantity,
+        price_eur=prices.get('eur'),
+        price_bgn=prices.get('bgn'),
+        old_price_eur=old_prices.get('eur'),
+        old_price_bgn=old_prices.get('bgn'),
+        discount_pct=discount_pct,
+        image_url=image_url,
+        product_url=product_url,
+    )
+
+
 # ============================================
 # Scraper Class
 # ============================================
@@ -107,6 +367,7 @@ class KauflandScraper:
             config=SessionConfig(
                 max_requests=30,  # Rotate frequently
                 max_age_seconds=900,  # 15 minutes
+                pool_maxsize=20,  # Offer pages are fetched concurrently
             )
         )
         self.rate_limiter = rate_limiter or DomainRateLimiter()
@@ -130,6 +391,13 @@ class KauflandScraper:
             'failures': 0,
             'products_scraped': 0,
         }
+        self._stats_lock = Lock()
+        self._async_client = None  # open only inside _client_scope()
+    
+    def _count(self, key: str):
+        """Increment a stats counter (offer pages are fetched concurrently)"""
+        with self._stats_lock:
+            self.stats[key] += 1
     
     def _make_request(self, url: str, timeout: int = 30) -> Optional[str]:
         """
@@ -150,141 +418,103 @@ class KauflandScraper:
         session = self.session_manager.get_session(self.DOMAIN)
         
         try:
-            self.stats['requests'] += 1
+            self._count('requests')
             start_time = time.time()
             
             # Make request through session
             response = session.get(url, timeout=timeout)
-            response_time = time.time() - start_time
-            
-            if response.status_code == 200:
-                self.circuit_breaker._on_success()
-                self.rate_limiter.report_success(url, response_time)
-                self.stats['successes'] += 1
-                return response.text
-            
-            elif response.status_code == 404:
-                # 404 is a valid response (page doesn't exist), not a failure
-                logger.info(f"Page not found (404): {url}")
-                self.circuit_breaker._on_success()  # Don't trip circuit breaker
-                self.rate_limiter.report_success(url, response_time)
-                return None  # But still return None (no content)
-            
-            else:
-                logger.warning(f"HTTP {response.status_code} from {url}")
-                self.circuit_breaker._on_failure()
-                self.rate_limiter.report_failure(url, response.status_code)
-                self.session_manager.report_error(self.DOMAIN, response.status_code)
-                self.stats['failures'] += 1
-                return None
+            return self._handle_response(url, response, time.time() - start_time)
                 
         except Exception as e:
             logger.error(f"Request failed: {e}")
             self.circuit_breaker._on_failure()
             self.rate_limiter.report_failure(url)
-            self.stats['failures'] += 1
+            self._count('failures')
             return None
     
-    def _parse_products(self, html: str, source_url: str) -> List[KauflandProduct]:
-        """Parse products from HTML content."""
-        soup = BeautifulSoup(html, 'html.parser')
-        products = []
+    def _handle_response(self, url: str, response, response_time: float) -> Optional[str]:
+        """
+        Report a response to the infrastructure.
+        Works for both requests and httpx responses; returns HTML or None.
+        """
+        if response.status_code == 200:
+            self.circuit_breaker._on_success()
+            self.rate_limiter.report_success(url, response_time)
+            self._count('successes')
+            return response.text
         
-        # Find all product title elements
-        titles = soup.select('div.k-product-tile__title')
+        elif response.status_code == 404:
+            # 404 is a valid response (page doesn't exist), not a failure
+            logger.info(f"Page not found (404): {url}")
+            self.circuit_breaker._on_success()  # Don't trip circuit breaker
+            self.rate_limiter.report_success(url, response_time)
+            return None  # But still return None (no content)
         
-        for title_div in titles:
-            try:
-                # Navigate to parent tile
-                tile = title_div.parent
-                while tile and not any('k-product-tile' == c for c in tile.get('class', [])):
-                    tile = tile.parent
-                    if tile is None or tile.name == 'body':
-                        tile = title_div.parent.parent.parent.parent
-                        break
-                
-                if not tile:
-                    continue
-                
-                title_text = title_div.get_text(strip=True)
-                
-                # Get subtitle (actual product description)
-                subtitle = tile.select_one('div.k-product-tile__subtitle')
-                subtitle_text = subtitle.get_text(strip=True) if subtitle else None
-                
-                # Combine brand + description for better matching
-                if subtitle_text:
-                    name = f"{title_text} {subtitle_text}".strip() if title_text else subtitle_text
-                else:
-                    name = title_text
-                    
-                if not name or len(name) < 3:
-                    continue
-                
-                quantity = None  # Will parse from combined name
-                
-                # Get both price tags (EUR and BGN)
-                pricetags = tile.select('div.k-product-tile__pricetag')
-                
-                price_eur = old_price_eur = None
-                price_bgn = old_price_bgn = None
-                discount_pct = None
-                
-                for pt in pricetags:
-                    price_div = pt.select_one('div.k-price-tag__price')
-                    old_price_div = pt.select_one('div.k-price-tag__old-price')
-                    discount_div = pt.select_one('div.k-price-tag__discount')
-                    
-                    if price_div:
-                        text = price_div.get_text(strip=True)
-                        if '€' in text:
-                            price_eur = parse_price(text)
-                        elif 'ЛВ' in text:
-                            price_bgn = parse_price(text)
-                    
-                    if old_price_div:
-                        text = old_price_div.get_text(strip=True)
-                        if '€' in text:
-                            old_price_eur = parse_price(text)
-                        elif 'ЛВ' in text:
-                            old_price_bgn = parse_price(text)
-                    
-                    if discount_div and not discount_pct:
-                        discount_pct = parse_discount(discount_div.get_text(strip=True))
-                
-                # Image
-                img = tile.select_one('img.k-product-tile__main-image')
-                image_url = None
-                if img:
-                    image_url = img.get('src') or img.get('data-src')
-                
-                # Product link
-                link = tile.select_one('a.k-product-tile__link')
-                product_url = None
-                if link and link.get('href'):
-                    href = link.get('href')
-                    if href.startswith('/'):
-                        product_url = f"{self.BASE_URL}{href}"
-                    else:
-                        product_url = href
-                
-                products.append(KauflandProduct(
-                    name=name,
-                    quantity=quantity,
-                    price_eur=price_eur,
-                    price_bgn=price_bgn,
-                    old_price_eur=old_price_eur,
-                    old_price_bgn=old_price_bgn,
-                    discount_pct=discount_pct,
-                    image_url=image_url,
-                    product_url=product_url,
-                ))
-                
-            except Exception as e:
-                logger.debug(f"Failed to parse product: {e}")
-                continue
+        else:
+            logger.warning(f"HTTP {response.status_code} from {url}")
+            self.circuit_breaker._on_failure()
+            self.rate_limiter.report_failure(url, response.status_code)
+            self.session_manager.report_error(self.DOMAIN, response.status_code)
+            self._count('failures')
+            return None
+    
+    @contextlib.asynccontextmanager
+    async def _client_scope(self):
+        """
+        Open the httpx client for the async API (HTTP/2 when h2 is installed).
+        Nested scopes reuse the open client; the outermost one closes it.
+        """
+        if httpx is None:
+            raise RuntimeError("httpx is required for the async Kaufland API")
+        if self._async_client is not None:
+            yield self._async_client
+            return
         
-        return products
+        self._async_client = httpx.AsyncClient(
+            http2=h2 is not None,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=30.0,
+        )
+        try:
+            yield self._async_client
+        finally:
+            await self._async_client.aclose()
+            self._async_client = None
+    
+    async def _make_request_async(self, url: str, timeout: int = 30) -> Optional[str]:
+        """Async counterpart of _make_request using the shared httpx client."""
+        if self.circuit_breaker.is_open:
+            logger.warning(f"Circuit breaker OPEN for {self.DOMAIN}")
+            return None
+        
+        # Claim a limiter slot without blocking the event loop
+        wait_time = self.rate_limiter.reserve(url)
+        if wait_time > 0:
+            logger.debug(f"Rate limiter: waiting {wait_time:.2f}s")
+            await asyncio.sleep(wait_time)
+        
+        # Reuse the rotating session's identity headers; httpx negotiates its own encoding
+        session = self.session_manager.get_session(self.DOMAIN)
+        headers = {k: v for k, v in session.session.headers.items() if k != 'Accept-Encoding'}
+        session.count_request()
+        
+        try:
+            self._count('requests')
+            start_time = time.time()
+            async with self._client_scope() as client:
+                response = await client.get(url, headers=headers, timeout=timeout)
+            return self._handle_response(url, response, time.time() - start_time)
+        
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+            self.circuit_breaker._on_failure()
+            self.rate_limiter.report_failure(url)
+            self._count('failures')
+            return None
+    
+    def _parse_products(self, html: str, source_url: str) -> List[KauflandProduct]:
+        """Parse products from HTML content."""
+        return parse_products(html, self.BASE_URL)
     
     def scrape_page(self, url: str) -> List[KauflandProduct]:
         """
@@ -329,22 +559,64 @@ class KauflandScraper:
         """
         logger.info("Starting Kaufland full scrape...")
         
+        # Pages are independent; the shared rate limiter still paces requests
+        with ThreadPoolExecutor(max_workers=len(self.OFFER_URLS)) as executor:
+            results = list(executor.map(self.scrape_page, self.OFFER_URLS))
+        
+        return self._merge_pages(results)
+    
+    def _merge_pages(self, results: List[List[KauflandProduct]]) -> List[KauflandProduct]:
+        """Combine per-page results, keeping the first product for each name."""
         all_products = []
-        seen_names = set()
+        seen_hashes: set[int] = set()
         
-        for url in self.OFFER_URLS:
-            products = self.scrape_page(url)
-            
+        for products in results:
             for p in products:
-                if p.name not in seen_names:
+                h = name_key(p.name)
+                if h not in seen_hashes:
                     all_products.append(p)
-                    seen_names.add(p.name)
+                    seen_hashes.add(h)
         
         self.stats['products_scraped'] = len(all_products)
         logger.info(f"Scraped {len(all_products)} total unique products from Kaufland")
         
         return all_products
     
+    async def scrape_page_async(self, url: str) -> List[KauflandProduct]:
+        """Async counterpart of scrape_page (non-blocking retry delays)."""
+        logger.info(f"Scraping: {url}")
+        
+        html = None
+        max_attempts = self.retry_handler.config.max_attempts
+        
+        async with self._client_scope():
+            for attempt in range(max_attempts):
+                html = await self._make_request_async(url)
+                if html is not None:
+                    break
+                
+                delay = self.retry_handler.get_delay(attempt)
+                logger.info(f"Retry {attempt + 1}/{max_attempts} after {delay:.1f}s")
+                await asyncio.sleep(delay)
+        
+        if html is None:
+            logger.error(f"Failed to fetch {url}")
+            return []
+        
+        products = self._parse_products(html, url)
+        logger.info(f"  Found {len(products)} products")
+        
+        return products
+    
+    async def scrape_all_offers_async(self) -> List[KauflandProduct]:
+        """Async counterpart of scrape_all_offers."""
+        logger.info("Starting Kaufland full scrape (async)...")
+        
+        async with self._client_scope():
+            results = await asyncio.gather(*(self.scrape_page_async(u) for u in self.OFFER_URLS))
+        
+        return self._merge_pages(results)
+    
     def get_stats(self) -> Dict:
         """Get scraper statistics"""
         return {
@@ -355,6 +627,30 @@ class KauflandScraper:
         }
 
 
+# ============================================
+# Standalone Function
+# ============================================
+
+# One pooled keep-alive session shared by every scrape_kaufland() call
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+    'Accept-Language': 'bg-BG,bg;q=0.9',
+})
+_SESSION.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0))
+
+
+def scrape_kaufland(url: str = KauflandScraper.OFFER_URLS[0]) -> List[KauflandProduct]:
+    """
+    Scrape a single offer page without the scraping infrastructure.
+    
+    Used by combined_scraper.py and run_scraper.py.
+    """
+    resp = _SESSION.get(url, timeout=30)
+    resp.raise_for_status()
+    return parse_products(resp.text, KauflandScraper.BASE_URL)
+
+
 # ============================================
 # CLI Interface
 # ============================================
@@ -395,8 +691,12 @@ def main():
     output_dir.mkdir(exist_ok=True)
     output_file = output_dir / "kaufland_products.json"
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump([asdict(p) for p in products], f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        # orjson serializes dataclasses natively, no asdict() pass needed
+        output_file.write_bytes(orjson.dumps(products, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump([_product_to_dict(p) for p in products], f, ensure_ascii=False, indent=2)
     
     print(f"\n📁 Saved to {output_file}")
     
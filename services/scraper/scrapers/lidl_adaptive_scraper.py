@@ -1,7 +1,7 @@
 """
 Lidl.bg Adaptive Scraper
 ========================
-Multi-strategy, human-like, self-healing scraper.
+Multi-strategy, self-healing scraper.
 Takes as long as needed to get ALL products with ALL attributes.
 
 Strategies (in order):
@@ -10,25 +10,66 @@ Strategies (in order):
 3. Offer page deep crawling
 4. Search-based discovery
 
-Human-like behavior:
-- Gaussian delays (4-8 seconds average)
-- Coffee breaks every 20 requests (2-5 minutes)
+Politeness:
+- Token-bucket pacing (4 requests/second)
+- Backs off only when the server asks (429/503, Retry-After)
 - Session rotation
 - Real browser fingerprints
 """
 
+import asyncio
 import json
 import logging
+import os
 import random
 import re
+import sys
 import time
-from dataclasses import dataclass, asdict, field
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import List, Optional, Dict, Set, Tuple
-from urllib.parse import urljoin, urlparse
+from typing import Iterator, List, Optional, Dict, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlsplit, urlunsplit
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree, html as lxml_html
+
+try:
+    import brotli  # noqa: F401 - lets urllib3 decode Content-Encoding: br
+    _ACCEPT_ENCODING = 'gzip, br'
+except ImportError:  # only advertise what can be decoded
+    _ACCEPT_ENCODING = 'gzip'
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:  # optional, builtin hash() is used otherwise
+    xxhash = None
+
+try:
+    import diskcache
+except ImportError:  # optional, every run fetches every page in full otherwise
+    diskcache = None
+
+try:
+    import aiohttp
+except ImportError:  # optional, categories are crawled one by one otherwise
+    aiohttp = None
+
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:  # optional, visited URLs are kept in a set otherwise
+    ScalableBloomFilter = None
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from services.scraper.core.rate_limiter import TokenBucketRateLimiter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -37,6 +78,119 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Decimal comma -> point and spaces dropped in one translate() pass, then one plain match
+_PRICE_TRANS = str.maketrans({',': '.', ' ': None, '\xa0': None})
+_PRICE_RE = re.compile(r'\d+\.\d+')
+_PCT_RE = re.compile(r'(\d+)%')
+
+
+def _has_class(cls: str) -> str:
+    """XPath predicate matching a CSS class token"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+# Product tile predicates, in order of preference
+_TILE_PREDICATES = (
+    _has_class('product-grid-box'),
+    _has_class('product-item'),
+    "contains(@class, 'product-tile')",
+    "contains(@class, 'productTile')",
+    "contains(@data-testid, 'product')",
+    _has_class('nuc-a-product-tile'),
+)
+_XP_ANY_TILE = etree.XPath('//*[' + ' or '.join(_TILE_PREDICATES) + ']')
+_XP_IS_TILE = tuple(etree.XPath(f'boolean(self::*[{pred}])') for pred in _TILE_PREDICATES)
+
+# Inside a tile: first match in document order, like select_one
+_XP_NAME = etree.XPath(
+    "(.//*[contains(@class, 'title') or contains(@class, 'name') or contains(@class, 'productTitle')"
+    " or self::h2 or self::h3 or self::h4])[1]"
+)
+_XP_PRICE = etree.XPath("(.//*[contains(@class, 'price') and not(contains(@class, 'old'))])[1]")
+_XP_OLD_PRICE = etree.XPath("(.//*[contains(@class, 'old-price') or contains(@class, 'oldPrice')])[1]")
+_XP_DISCOUNT = etree.XPath("(.//*[contains(@class, 'discount') or contains(@class, 'saving')])[1]")
+_XP_IMG = etree.XPath('(.//img)[1]')
+_XP_LINK = etree.XPath("(.//a[contains(@href, '/p/')])[1]")
+
+_XP_JSONLD = etree.XPath("//script[@type='application/ld+json']/text()", smart_strings=False)
+_XP_HREFS = etree.XPath('//a[@href]')
+
+
+_DEFAULT_PORTS = {'http': ':80', 'https': ':443'}
+_TRACKING_PARAMS = ('utm_', 'gclid', 'fbclid')
+_SKIP_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.pdf', '.mp4', '.zip')
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    Canonical form of a URL for de-duplication, or None for non-HTML resources.
+    Lowercases scheme/host, drops the default port, the fragment, tracking
+    parameters and a trailing slash.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    port = _DEFAULT_PORTS.get(scheme)
+    if port and netloc.endswith(port):
+        netloc = netloc[:-len(port)]
+        
+    path = parts.path or '/'
+    if path.lower().endswith(_SKIP_EXTENSIONS):
+        return None
+    if len(path) > 1:
+        path = path.rstrip('/')
+        
+    query = parts.query
+    if query:
+        query = urlencode([(k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+                           if not k.startswith(_TRACKING_PARAMS)])
+        
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def name_key(name: str) -> int:
+    """64-bit key for de-duplicating normalized product names"""
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(name.encode('utf-8'))
+    return hash(name)
+
+
+# Reused for every page: no per-call parser setup, and no id table (nothing looks ids up).
+# lidl.bg serves UTF-8; pinning it also covers pages without a <meta charset>.
+_HTML_PARSER = lxml_html.HTMLParser(
+    encoding='utf-8', recover=True, remove_blank_text=True, collect_ids=False, huge_tree=False,
+)
+
+
+def parse_html(content: bytes) -> Optional[lxml_html.HtmlElement]:
+    """Parse a page from raw bytes"""
+    if not content.strip():
+        return None
+    return lxml_html.document_fromstring(content, parser=_HTML_PARSER)
+
+
+def _text(el) -> str:
+    """Stripped text of an element, joined like BeautifulSoup's get_text(strip=True)"""
+    return ''.join(t.strip() for t in el.itertext())
+
+
+def _first(xpath, el):
+    found = xpath(el)
+    return found[0] if found else None
+
+
+def stream_sitemap_locs(source) -> Iterator[str]:
+    """Yield sitemap <loc> texts from a file-like object without building the whole tree"""
+    for _, loc in etree.iterparse(source, events=('end',), tag='{*}loc'):
+        if loc.text:
+            yield loc.text.strip()
+        # Drop what has been read: the <loc> itself and the <url> entries before it
+        loc.clear()
+        entry = loc.getparent()
+        while entry is not None and entry.getprevious() is not None:
+            del entry.getparent()[0]
+
+
 @dataclass
 class Product:
     name: str
@@ -53,12 +207,182 @@ class Product:
     description: Optional[str] = None
 
 
+_PRODUCT_FIELDS = tuple(f.name for f in fields(Product))
+
+
+def _dump_product(p: Product, indent: bool = False) -> bytes:
+    """One product as JSON bytes (flat fields, so no asdict() deep copy)"""
+    d = p.__dict__
+    row = {k: d[k] for k in _PRODUCT_FIELDS}
+    if orjson is not None:
+        return orjson.dumps(row, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(row, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def parse_price(text: str) -> Optional[float]:
+    if not text:
+        return None
+    # Handle both "1,99" and "1.99" formats
+    match = _PRICE_RE.search(text.translate(_PRICE_TRANS))
+    if match:
+        return float(match.group())
+    return None
+
+
+def extract_jsonld_products(doc: lxml_html.HtmlElement) -> List[Product]:
+    """Extract products from JSON-LD structured data"""
+    products = []
+    for script in _XP_JSONLD(doc):
+        try:
+            data = orjson.loads(script) if orjson is not None else json.loads(script)
+            items = []
+            
+            if data.get('@type') == 'ItemList':
+                items = [i.get('item', i) for i in data.get('itemListElement', [])]
+            elif data.get('@type') == 'Product':
+                items = [data]
+            elif isinstance(data, list):
+                items = [d for d in data if d.get('@type') == 'Product']
+                
+            for item in items:
+                name = item.get('name', '')
+                if not name:
+                    continue
+                    
+                offers = item.get('offers', {})
+                if isinstance(offers, list):
+                    offers = offers[0] if offers else {}
+                    
+                price = parse_price(str(offers.get('price', '')))
+                
+                brand = item.get('brand', {})
+                if isinstance(brand, dict):
+                    brand = brand.get('name', '')
+                    
+                products.append(Product(
+                    name=name,
+                    price_eur=price,
+                    image_url=item.get('image'),
+                    product_url=item.get('url'),
+                    brand=brand,
+                    description=item.get('description', '')[:200] if item.get('description') else None,
+                ))
+                
+        except json.JSONDecodeError:  # also raised by orjson
+            pass
+        except Exception as e:
+            logger.debug(f"JSON-LD parse error: {e}")
+            
+    return products
+
+
+def extract_html_products(doc: lxml_html.HtmlElement, category: str, base_url: str) -> List[Product]:
+    """Extract products from HTML elements"""
+    products = []
+    
+    # One DOM walk for all tile selectors, then keep the most preferred one that matched
+    candidates = _XP_ANY_TILE(doc)
+    tiles = []
+    for is_tile in _XP_IS_TILE:
+        tiles = [t for t in candidates if is_tile(t)]
+        if tiles:
+            break
+            
+    for tile in tiles:
+        try:
+            # Find name
+            name_el = _first(_XP_NAME, tile)
+            name = _text(name_el) if name_el is not None else ''
+            if not name or len(name) < 3:
+                continue
+                
+            # Find price
+            price_el = _first(_XP_PRICE, tile)
+            price = parse_price(price_el.text_content() if price_el is not None else '')
+            
+            # Find old price
+            old_price_el = _first(_XP_OLD_PRICE, tile)
+            old_price = parse_price(old_price_el.text_content() if old_price_el is not None else '')
+            
+            # Find discount
+            discount = None
+            discount_el = _first(_XP_DISCOUNT, tile)
+            if discount_el is not None:
+                match = _PCT_RE.search(discount_el.text_content())
+                if match:
+                    discount = int(match.group(1))
+                    
+            # Find image
+            img = _first(_XP_IMG, tile)
+            img_url = None
+            if img is not None:
+                img_url = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+                
+            # Find product link
+            link = _first(_XP_LINK, tile)
+            prod_url = None
+            if link is not None:
+                href = link.get('href', '')
+                prod_url = urljoin(base_url, href) if href else None
+                
+            products.append(Product(
+                name=name,
+                price_eur=price,
+                old_price_eur=old_price,
+                discount_pct=discount,
+                image_url=img_url,
+                product_url=prod_url,
+                category=category,
+            ))
+            
+        except Exception as e:
+            logger.debug(f"HTML parse error: {e}")
+            
+    return products
+
+
+def extract_category_links(doc: lxml_html.HtmlElement, base_url: str) -> List[Tuple[str, str]]:
+    """Find category URLs on a page, as (normalized url, name)"""
+    categories = []
+    seen = set()
+    
+    for a in _XP_HREFS(doc):
+        href = a.get('href')
+        
+        # Look for category patterns
+        if '/c/' in href or '/s1' in href:
+            full_url = normalize_url(urljoin(base_url, href))
+            if full_url and full_url not in seen:
+                seen.add(full_url)
+                name = _text(a) or urlparse(href).path.split('/')[-1]
+                categories.append((full_url, name))
+                
+    return categories
+
+
+def extract_page(doc: lxml_html.HtmlElement, category: str,
+                 base_url: str) -> Tuple[List[Product], List[Tuple[str, str]]]:
+    """All products (JSON-LD first) and category links on a page"""
+    products = extract_jsonld_products(doc) + extract_html_products(doc, category, base_url)
+    return products, extract_category_links(doc, base_url)
+
+
+def parse_page(body: bytes, category: str,
+               base_url: str) -> Optional[Tuple[List[Product], List[Tuple[str, str]]]]:
+    """parse_html + extract_page; top-level so it can run in a worker process"""
+    doc = parse_html(body)
+    if doc is None:
+        return None
+    return extract_page(doc, category, base_url)
+
+
 @dataclass  
 class ScraperStats:
     requests_made: int = 0
     products_found: int = 0
     categories_scraped: int = 0
-    coffee_breaks: int = 0
+    backoffs: int = 0
+    not_modified: int = 0
     errors: int = 0
     strategy_used: str = ""
     start_time: float = field(default_factory=time.time)
@@ -75,13 +399,21 @@ class LidlAdaptiveScraper:
     BASE_URL = "https://www.lidl.bg"
     EUR_BGN = 1.9558
     
-    # Human-like timing
-    MIN_DELAY = 3.0
-    MAX_DELAY = 12.0
-    AVG_DELAY = 5.0
-    COFFEE_BREAK_EVERY = 20
-    COFFEE_BREAK_MIN = 60  # 1 minute
-    COFFEE_BREAK_MAX = 180  # 3 minutes
+    # Pacing: token bucket, plus backoff when the server pushes back
+    REQUESTS_PER_SECOND = 4.0
+    BURST = 4
+    BACKOFF_BASE = 2.0  # seconds, doubled per consecutive 429/503
+    BACKOFF_MAX = 300.0
+    BACKOFF_STATUSES = (429, 503)
+    BACKOFF_RETRIES = 3  # a 429/503 page is asked for again once the backoff has passed
+    ROTATE_EVERY = 20  # requests per fingerprint
+    
+    # Pages kept on disk between runs and revalidated with ETag/Last-Modified (diskcache only)
+    PAGE_CACHE_DIR = Path(__file__).parent.parent / "data" / "cache" / "lidl_adaptive"
+    PAGE_CACHE_EXPIRE = 7 * 24 * 3600  # seconds
+    
+    # Concurrent category crawl (aiohttp only)
+    MAX_CONCURRENCY = 8  # in-flight requests to lidl.bg
     
     # User agents (rotate these)
     USER_AGENTS = [
@@ -93,19 +425,39 @@ class LidlAdaptiveScraper:
     
     def __init__(self):
         self.session = requests.Session()
+        # One keep-alive pool for the whole crawl, so TCP+TLS is paid once per host
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            # 429/503 are left to _note_status, which honours Retry-After across all requests
+            max_retries=Retry(total=3, backoff_factor=1.5, status_forcelist=[500, 502, 504],
+                              respect_retry_after_header=False),
+        ))
         self._rotate_session()
-        self.products: Dict[str, Product] = {}  # name.lower() -> Product
-        self.visited_urls: Set[str] = set()
+        self.products: List[Product] = []
+        self._product_keys: Set[int] = set()  # name_key() of every product in self.products
+        # Sitemaps put every product URL in here; a Bloom filter keeps that to ~2 bytes/URL
+        # at the cost of a 0.1% chance of skipping a page that was never fetched
+        if ScalableBloomFilter is not None:
+            self.visited_urls = ScalableBloomFilter(initial_capacity=100_000, error_rate=0.001)
+        else:
+            self.visited_urls: Set[str] = set()
         self.stats = ScraperStats()
         
+        self.rate_limiter = TokenBucketRateLimiter(rate=self.REQUESTS_PER_SECOND, capacity=self.BURST)
+        self._blocked_until = 0.0  # monotonic time before which nothing is sent
+        self._in_flight: Set[str] = set()  # claimed by an _afetch task, not visited yet
+        self._backoff_attempts = 0
+        self.page_cache = diskcache.Cache(str(self.PAGE_CACHE_DIR)) if diskcache is not None else None
+        
     def _rotate_session(self):
-        """Create new session with random fingerprint"""
+        """New random fingerprint; the session and its connection pool are kept"""
         ua = random.choice(self.USER_AGENTS)
         self.session.headers.update({
             'User-Agent': ua,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
             'Accept-Language': 'bg-BG,bg;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': _ACCEPT_ENCODING,
             'DNT': '1',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
@@ -116,43 +468,94 @@ class LidlAdaptiveScraper:
         })
         logger.debug(f"Rotated session, UA: {ua[:50]}...")
         
-    def _human_delay(self):
-        """Gaussian delay to mimic human browsing"""
-        delay = max(self.MIN_DELAY, random.gauss(self.AVG_DELAY, 2.0))
-        delay = min(delay, self.MAX_DELAY)
-        time.sleep(delay)
+    def _reserve_slot(self) -> float:
+        """
+        Count a request and take a token for it.
+        Returns how long to wait before sending, including any backoff.
+        """
+        self.stats.requests_made += 1
+        if self.stats.requests_made % self.ROTATE_EVERY == 0:
+            self._rotate_session()
+            
+        wait = self.rate_limiter.reserve()
+        return max(wait, self._blocked_until - time.monotonic())
+        
+    def _pace(self):
+        """Wait for a request slot"""
+        time.sleep(self._reserve_slot())
+        
+    def _note_status(self, status: int, headers):
+        """Back off when the server asks for it, reset once it answers normally"""
+        if status not in self.BACKOFF_STATUSES:
+            if status in (200, 304):
+                self._backoff_attempts = 0
+            return
+            
+        retry_after = headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self.BACKOFF_BASE * 2 ** self._backoff_attempts + random.uniform(0, 1)
+        delay = min(delay, self.BACKOFF_MAX)
         
-    def _coffee_break(self):
-        """Take a longer break (human would grab coffee)"""
-        duration = random.uniform(self.COFFEE_BREAK_MIN, self.COFFEE_BREAK_MAX)
-        logger.info(f"☕ Coffee break: {duration:.0f} seconds...")
-        self.stats.coffee_breaks += 1
-        time.sleep(duration)
-        self._rotate_session()  # New session after break
+        self._backoff_attempts += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        self.stats.backoffs += 1
+        logger.info(f"Status {status}, backing off {delay:.0f}s")
         
-    def _fetch(self, url: str, referer: str = None) -> Optional[BeautifulSoup]:
-        """Fetch URL with human-like behavior"""
-        if url in self.visited_urls:
+    def _revalidate(self, url: str, headers: Dict[str, str]) -> Optional[tuple]:
+        """Add conditional-GET headers for a page cached by an earlier run; returns its cache entry"""
+        if self.page_cache is None:
             return None
-            
-        self.stats.requests_made += 1
+        entry = self.page_cache.get(url)  # (etag, last_modified, body)
+        if entry is not None:
+            etag, last_modified, _ = entry
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return entry
         
-        # Coffee break every N requests
-        if self.stats.requests_made % self.COFFEE_BREAK_EVERY == 0:
-            self._coffee_break()
-        else:
-            self._human_delay()
+    def _remember(self, url: str, resp_headers, body: bytes):
+        """Cache a page body with its validators, if the server sent any"""
+        if self.page_cache is None:
+            return
+        etag = resp_headers.get('ETag')
+        last_modified = resp_headers.get('Last-Modified')
+        if etag or last_modified:
+            self.page_cache.set(url, (etag, last_modified, body), expire=self.PAGE_CACHE_EXPIRE)
+            
+    def _fetch(self, url: str, referer: str = None) -> Optional[lxml_html.HtmlElement]:
+        """Fetch URL and parse it, or None if already visited or failed"""
+        url = normalize_url(url)
+        if url is None or url in self.visited_urls:
+            return None
             
         try:
             headers = {}
             if referer:
                 headers['Referer'] = referer
+            cached = self._revalidate(url, headers)
+                
+            for _ in range(self.BACKOFF_RETRIES + 1):
+                self._pace()  # also waits out a backoff set by the previous attempt
+                resp = self.session.get(url, headers=headers, timeout=30)
+                self._note_status(resp.status_code, resp.headers)
+                if resp.status_code not in self.BACKOFF_STATUSES:
+                    break
+            else:
+                # Left unvisited, so a later link to it gets another go
+                logger.warning(f"Status {resp.status_code}, giving up for now: {url}")
+                self.stats.errors += 1
+                return None
                 
-            resp = self.session.get(url, headers=headers, timeout=30)
             self.visited_urls.add(url)
-            
+            if resp.status_code == 304 and cached is not None:
+                self.stats.not_modified += 1
+                return parse_html(cached[2])
             if resp.status_code == 200:
-                return BeautifulSoup(resp.text, 'html.parser')
+                self._remember(url, resp.headers, resp.content)
+                return parse_html(resp.content)
             else:
                 logger.warning(f"Status {resp.status_code}: {url}")
                 self.stats.errors += 1
@@ -163,166 +566,166 @@ class LidlAdaptiveScraper:
             self.stats.errors += 1
             return None
             
-    def _parse_price(self, text: str) -> Optional[float]:
-        if not text:
+    def _fetch_sitemap(self, url: str) -> Optional[int]:
+        """Stream a sitemap, marking its product URLs as known. Returns how many were found."""
+        if url in self.visited_urls:
             return None
-        # Handle both "1,99" and "1.99" formats
-        match = re.search(r'([\d]+[,.][\d]+)', text.replace(' ', ''))
-        if match:
-            return float(match.group(1).replace(',', '.'))
-        return None
-        
-    def _add_product(self, product: Product):
-        """Add product, avoiding duplicates"""
-        key = product.name.lower().strip()
-        if key and key not in self.products:
-            self.products[key] = product
-            self.stats.products_found += 1
             
-    def _extract_jsonld_products(self, soup: BeautifulSoup) -> int:
-        """Extract products from JSON-LD structured data"""
-        count = 0
-        for script in soup.find_all('script', type='application/ld+json'):
-            try:
-                data = json.loads(script.string)
-                items = []
+        self._pace()
+        
+        try:
+            with self.session.get(url, timeout=30, stream=True) as resp:
+                self.visited_urls.add(url)
+                self._note_status(resp.status_code, resp.headers)
                 
-                if data.get('@type') == 'ItemList':
-                    items = [i.get('item', i) for i in data.get('itemListElement', [])]
-                elif data.get('@type') == 'Product':
-                    items = [data]
-                elif isinstance(data, list):
-                    items = [d for d in data if d.get('@type') == 'Product']
-                    
-                for item in items:
-                    name = item.get('name', '')
-                    if not name:
-                        continue
-                        
-                    offers = item.get('offers', {})
-                    if isinstance(offers, list):
-                        offers = offers[0] if offers else {}
-                        
-                    price = self._parse_price(str(offers.get('price', '')))
+                if resp.status_code != 200:
+                    logger.warning(f"Status {resp.status_code}: {url}")
+                    self.stats.errors += 1
+                    return None
                     
-                    brand = item.get('brand', {})
-                    if isinstance(brand, dict):
-                        brand = brand.get('name', '')
-                        
-                    self._add_product(Product(
-                        name=name,
-                        price_eur=price,
-                        price_bgn=price * self.EUR_BGN if price else None,
-                        image_url=item.get('image'),
-                        product_url=item.get('url'),
-                        brand=brand,
-                        description=item.get('description', '')[:200] if item.get('description') else None,
-                    ))
-                    count += 1
-                    
-            except json.JSONDecodeError:
-                pass
-            except Exception as e:
-                logger.debug(f"JSON-LD parse error: {e}")
+                resp.raw.decode_content = True  # let urllib3 undo gzip/br
+                count = 0
+                for loc in stream_sitemap_locs(resp.raw):
+                    if '/p/' in loc:  # Product page
+                        n = normalize_url(loc)
+                        if n:  # non-HTML resources (images etc.) normalize to None
+                            self.visited_urls.add(n)  # Just mark, don't fetch individual pages
+                            count += 1
+                return count
                 
-        return count
-        
-    def _extract_html_products(self, soup: BeautifulSoup, category: str = None) -> int:
-        """Extract products from HTML elements"""
-        count = 0
-        
-        # Try various product tile selectors
-        selectors = [
-            '.product-grid-box',
-            '.product-item',
-            '[class*="product-tile"]',
-            '[class*="productTile"]',
-            '[data-testid*="product"]',
-            '.nuc-a-product-tile',
-        ]
+        except Exception as e:
+            logger.error(f"Error fetching {url}: {e}")
+            self.stats.errors += 1
+            return None
+            
+    async def _afetch(self, http: "aiohttp.ClientSession", url: str,
+                      referer: str = None) -> Optional[bytes]:
+        """Async _fetch, bounded by self._sem. Returns the raw body; parsing is left to the caller."""
+        url = normalize_url(url)
+        if url is None or url in self.visited_urls or url in self._in_flight:
+            return None
+        self._in_flight.add(url)  # claim it before awaiting so no other task fetches it
         
-        tiles = []
-        for selector in selectors:
-            tiles = soup.select(selector)
-            if tiles:
-                break
+        try:
+            async with self._sem:
+                return await self._afetch_claimed(http, url, referer)
+        finally:
+            self._in_flight.discard(url)
+            
+    async def _afetch_claimed(self, http: "aiohttp.ClientSession", url: str,
+                              referer: Optional[str]) -> Optional[bytes]:
+        """_afetch once url is claimed and a concurrency slot is held"""
+        try:
+            # aiohttp negotiates its own Accept-Encoding
+            headers = {k: v for k, v in self.session.headers.items() if k != 'Accept-Encoding'}
+            if referer:
+                headers['Referer'] = referer
+            cached = self._revalidate(url, headers)
                 
-        for tile in tiles:
-            try:
-                # Find name
-                name_el = tile.select_one(
-                    '[class*="title"], [class*="name"], '
-                    '[class*="productTitle"], h2, h3, h4'
-                )
-                name = name_el.get_text(strip=True) if name_el else ''
-                if not name or len(name) < 3:
-                    continue
+            for _ in range(self.BACKOFF_RETRIES + 1):
+                await asyncio.sleep(self._reserve_slot())  # includes any backoff
+                async with http.get(url, headers=headers) as resp:
+                    self._note_status(resp.status, resp.headers)
+                    if resp.status in self.BACKOFF_STATUSES:
+                        continue
+                    self.visited_urls.add(url)
+                    if resp.status == 304 and cached is not None:
+                        self.stats.not_modified += 1
+                        return cached[2]
+                    if resp.status == 200:
+                        body = await resp.read()
+                        self._remember(url, resp.headers, body)
+                        return body
+                    logger.warning(f"Status {resp.status}: {url}")
+                    self.stats.errors += 1
+                    return None
                     
-                # Find price
-                price_el = tile.select_one('[class*="price"]:not([class*="old"])')
-                price = self._parse_price(price_el.get_text() if price_el else '')
+            # Left unvisited, so a later link to it gets another go
+            logger.warning(f"Status {resp.status}, giving up for now: {url}")
+            self.stats.errors += 1
+            return None
                 
-                # Find old price
-                old_price_el = tile.select_one('[class*="old-price"], [class*="oldPrice"]')
-                old_price = self._parse_price(old_price_el.get_text() if old_price_el else '')
+        except Exception as e:
+            logger.error(f"Error fetching {url}: {e}")
+            self.stats.errors += 1
+            return None
                 
-                # Find discount
-                discount = None
-                discount_el = tile.select_one('[class*="discount"], [class*="saving"]')
-                if discount_el:
-                    match = re.search(r'(\d+)%', discount_el.get_text())
-                    if match:
-                        discount = int(match.group(1))
-                        
-                # Find image
-                img = tile.select_one('img')
-                img_url = None
-                if img:
-                    img_url = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
-                    
-                # Find product link
-                link = tile.select_one('a[href*="/p/"]')
-                prod_url = None
-                if link:
-                    href = link.get('href', '')
-                    prod_url = urljoin(self.BASE_URL, href) if href else None
+    def _add_product(self, product: Product):
+        """Add product, avoiding duplicates"""
+        name = product.name.lower().strip()
+        if not name:
+            return
+        key = name_key(name)
+        if key not in self._product_keys:
+            self._product_keys.add(key)
+            self.products.append(product)
+            self.stats.products_found += 1
+            
+    def _fill_bgn_prices(self):
+        """Derive the BGN prices from the EUR ones once the crawl is done"""
+        rate = self.EUR_BGN
+        for p in self.products:
+            p.price_bgn = p.price_eur * rate if p.price_eur else None
+            p.old_price_bgn = p.old_price_eur * rate if p.old_price_eur else None
                     
-                self._add_product(Product(
-                    name=name,
-                    price_eur=price,
-                    price_bgn=price * self.EUR_BGN if price else None,
-                    old_price_eur=old_price,
-                    old_price_bgn=old_price * self.EUR_BGN if old_price else None,
-                    discount_pct=discount,
-                    image_url=img_url,
-                    product_url=prod_url,
-                    category=category,
-                ))
-                count += 1
-                
-            except Exception as e:
-                logger.debug(f"HTML parse error: {e}")
+    def _merge_page(self, page: Tuple[List[Product], List[Tuple[str, str]]], label: str) -> List[Tuple[str, str]]:
+        """Add a category page's products; returns its category links not visited yet"""
+        products, links = page
+        for product in products:
+            self._add_product(product)
+        if products:
+            logger.info(f"{label}: {len(products)} products")
+        self.stats.categories_scraped += 1
+        return [(url, name) for url, name in links if url not in self.visited_urls]
+        
+    def _crawl_categories(self, categories: List[Tuple[str, str]]):
+        """Fetch categories and their subcategories one at a time"""
+        for cat_url, cat_name in categories:
+            doc = self._fetch(cat_url, referer=self.BASE_URL)
+            if doc is not None:
+                subcats = self._merge_page(extract_page(doc, cat_name, self.BASE_URL), f"  {cat_name}")
                 
-        return count
+                for sub_url, sub_name in subcats[:10]:  # Limit subcategories
+                    sub_doc = self._fetch(sub_url, referer=cat_url)
+                    if sub_doc is not None:
+                        category = f"{cat_name}/{sub_name}"
+                        self._merge_page(extract_page(sub_doc, category, self.BASE_URL), f"    {sub_name}")
+                        
+    async def _afetch_page(self, http: "aiohttp.ClientSession", url: str, referer: str,
+                           category: str) -> Optional[Tuple[List[Product], List[Tuple[str, str]]]]:
+        """Fetch a page and parse it in the worker pool while the event loop keeps fetching"""
+        body = await self._afetch(http, url, referer=referer)
+        if body is None:
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._parse_pool, parse_page, body, category, self.BASE_URL)
         
-    def _discover_category_urls(self, soup: BeautifulSoup) -> List[Tuple[str, str]]:
-        """Find category URLs from a page"""
-        categories = []
-        seen = set()
+    async def _crawl_category_async(self, http: "aiohttp.ClientSession", cat_url: str, cat_name: str):
+        """Fetch one category, then its subcategories as soon as its links are known"""
+        page = await self._afetch_page(http, cat_url, self.BASE_URL, cat_name)
+        if page is None:
+            return
+        subcats = self._merge_page(page, f"  {cat_name}")[:10]  # Limit subcategories
         
-        for a in soup.find_all('a', href=True):
-            href = a['href']
-            
-            # Look for category patterns
-            if '/c/' in href or '/s1' in href:
-                full_url = urljoin(self.BASE_URL, href)
-                if full_url not in seen and full_url not in self.visited_urls:
-                    seen.add(full_url)
-                    name = a.get_text(strip=True) or urlparse(href).path.split('/')[-1]
-                    categories.append((full_url, name))
-                    
-        return categories
+        sub_pages = await asyncio.gather(*[
+            self._afetch_page(http, sub_url, cat_url, f"{cat_name}/{sub_name}") for sub_url, sub_name in subcats
+        ])
+        for (_, sub_name), sub_page in zip(subcats, sub_pages):
+            if sub_page is not None:
+                self._merge_page(sub_page, f"    {sub_name}")
+                
+    async def _crawl_categories_async(self, categories: List[Tuple[str, str]]):
+        """Crawl all categories, MAX_CONCURRENCY requests at a time, parsing on all cores"""
+        self._sem = asyncio.BoundedSemaphore(self.MAX_CONCURRENCY)
         
+        connector = aiohttp.TCPConnector(limit_per_host=self.MAX_CONCURRENCY, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=30)
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as self._parse_pool:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+                await asyncio.gather(*[
+                    self._crawl_category_async(http, cat_url, cat_name) for cat_url, cat_name in categories
+                ])
+                    
     def scrape(self) -> List[Product]:
         """
         Main scraping method. Tries multiple strategies.
@@ -330,57 +733,40 @@ class LidlAdaptiveScraper:
         """
         logger.info("=" * 60)
         logger.info("Lidl Adaptive Scraper - Starting")
-        logger.info("This may take 15-30 minutes for complete data")
+        logger.info("This may take a few minutes for complete data")
         logger.info("=" * 60)
         
         # Strategy 1: Try sitemap first
         logger.info("\n📋 Strategy 1: Checking sitemap...")
-        sitemap_soup = self._fetch(f"{self.BASE_URL}/sitemap.xml")
-        if sitemap_soup:
-            # Parse sitemap for product URLs
-            for loc in sitemap_soup.find_all('loc'):
-                url = loc.get_text()
-                if '/p/' in url:  # Product page
-                    self.visited_urls.add(url)  # Just mark, don't fetch individual pages
-            logger.info(f"  Found {len([u for u in self.visited_urls if '/p/' in u])} product URLs in sitemap")
+        sitemap_count = self._fetch_sitemap(f"{self.BASE_URL}/sitemap.xml")
+        if sitemap_count is not None:
+            logger.info(f"  Found {sitemap_count} product URLs in sitemap")
         else:
             logger.info("  Sitemap not available, using other strategies")
             
         # Strategy 2: Homepage -> Categories
         logger.info("\n🏠 Strategy 2: Homepage category discovery...")
         homepage = self._fetch(self.BASE_URL)
-        if homepage:
-            # Extract products from homepage
-            count = self._extract_jsonld_products(homepage)
-            count += self._extract_html_products(homepage, "homepage")
-            logger.info(f"  Homepage: {count} products")
+        if homepage is not None:
+            # Extract products and category links from homepage
+            products, links = extract_page(homepage, "homepage", self.BASE_URL)
+            for product in products:
+                self._add_product(product)
+            logger.info(f"  Homepage: {len(products)} products")
             
-            # Find category links
-            categories = self._discover_category_urls(homepage)
+            categories = [(url, name) for url, name in links if url not in self.visited_urls]
             logger.info(f"  Found {len(categories)} category links")
             
             # Strategy 3: Deep crawl categories
             logger.info("\n📁 Strategy 3: Deep category crawling...")
-            for cat_url, cat_name in categories[:30]:  # Limit to 30 categories
-                soup = self._fetch(cat_url, referer=self.BASE_URL)
-                if soup:
-                    count = self._extract_jsonld_products(soup)
-                    count += self._extract_html_products(soup, cat_name)
-                    if count > 0:
-                        logger.info(f"  {cat_name}: {count} products")
-                    self.stats.categories_scraped += 1
-                    
-                    # Find subcategories
-                    subcats = self._discover_category_urls(soup)
-                    for sub_url, sub_name in subcats[:10]:  # Limit subcategories
-                        sub_soup = self._fetch(sub_url, referer=cat_url)
-                        if sub_soup:
-                            count = self._extract_jsonld_products(sub_soup)
-                            count += self._extract_html_products(sub_soup, f"{cat_name}/{sub_name}")
-                            if count > 0:
-                                logger.info(f"    {sub_name}: {count} products")
-                            self.stats.categories_scraped += 1
+            categories = categories[:30]  # Limit to 30 categories
+            if aiohttp is not None:
+                asyncio.run(self._crawl_categories_async(categories))
+            else:
+                self._crawl_categories(categories)
                             
+        self._fill_bgn_prices()
+        
         # Final stats
         logger.info("\n" + "=" * 60)
         logger.info("SCRAPING COMPLETE")
@@ -389,21 +775,34 @@ class LidlAdaptiveScraper:
         logger.info(f"Products found: {self.stats.products_found}")
         logger.info(f"Categories scraped: {self.stats.categories_scraped}")
         logger.info(f"Requests made: {self.stats.requests_made}")
-        logger.info(f"Coffee breaks: {self.stats.coffee_breaks}")
+        logger.info(f"Backoffs: {self.stats.backoffs}")
+        logger.info(f"Not modified (from cache): {self.stats.not_modified}")
         logger.info(f"Errors: {self.stats.errors}")
         
-        return list(self.products.values())
+        return self.products
         
     def save(self, filepath: str = None):
+        """
+        Write products one at a time, so only one serialized row is in memory.
+        A .jsonl path gets NDJSON; anything else gets a JSON array (what the importer reads).
+        """
         if filepath is None:
             filepath = Path(__file__).parent.parent / "data" / "lidl_products.json"
-            
-        products_list = [asdict(p) for p in self.products.values()]
+        filepath = Path(filepath)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(products_list, f, ensure_ascii=False, indent=2)
+        with open(filepath, 'wb') as f:
+            if filepath.suffix == '.jsonl':
+                for p in self.products:
+                    f.write(_dump_product(p))
+                    f.write(b'\n')
+            else:
+                f.write(b'[')
+                for i, p in enumerate(self.products):
+                    f.write(b',\n' if i else b'\n')
+                    f.write(_dump_product(p, indent=True))
+                f.write(b'\n]\n' if self.products else b']\n')
             
-        logger.info(f"💾 Saved {len(products_list)} products to {filepath}")
+        logger.info(f"💾 Saved {len(self.products)} products to {filepath}")
 
 
 if __name__ == "__main__":
@@ -24,18 +24,30 @@ import logging
 import random
 import re
 import time
-from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Set
 
 import requests
+from lxml import etree, html as lxml_html
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:  # optional, seen product IDs are kept in a set otherwise
+    ScalableBloomFilter = None
 
 # Infrastructure imports
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 
 from services.scraper.core.session_manager import SessionManager, SessionConfig
-from services.scraper.core.rate_limiter import DomainRateLimiter
+from services.scraper.core.rate_limiter import RateLimitConfig, TokenBucketDomainRateLimiter
 from services.scraper.core.circuit_breaker import CircuitBreaker
 from services.scraper.core.retry_handler import RetryHandler, RetryConfig
 
@@ -43,6 +55,11 @@ logger = logging.getLogger(__name__)
 
 API_BASE = "https://www.lidl.bg/q/api/search"
 DOMAIN = "www.lidl.bg"
+NON_RETRYABLE_STATUSES = (400, 404, 410)  # retrying won't bring these pages back
+CATEGORY_WORKERS = 4  # categories fetched at once; the shared rate limiter still paces every request
+
+_SIZE_UNITS = frozenset(("g", "kg", "ml", "l", "бр"))
+_FAT_RE = re.compile(r'([\d.,]+%)\s*масленост')
 
 # Food categories discovered during testing
 FOOD_CATEGORIES = {
@@ -60,9 +77,19 @@ FOOD_CATEGORIES = {
 }
 
 
+class _NonRetryable(Exception):
+    """API answered with a status that no retry will fix"""
+
+
 @dataclass
 class LidlProduct:
     """Clean product data from Lidl API"""
+    # Written out rather than slots=True, which needs Python 3.10 (no field has a default)
+    __slots__ = ('product_id', 'name', 'brand', 'size', 'size_unit', 'size_value',
+                 'price_eur', 'price_bgn', 'old_price_eur', 'old_price_bgn', 'discount_percent',
+                 'description', 'category', 'image_url', 'product_url', 'ians',
+                 'availability', 'raw_keyfacts')
+    
     product_id: str
     name: str
     brand: Optional[str]
@@ -83,6 +110,10 @@ class LidlProduct:
     raw_keyfacts: Optional[str]  # Original keyfacts HTML for parsing additional data
 
 
+# All fields are flat primitives/lists, so a plain getattr copy replaces asdict()
+_FIELD_NAMES = tuple(f.name for f in fields(LidlProduct))
+
+
 class LidlApiScraper:
     """
     Scrapes Lidl.bg using the search API.
@@ -90,20 +121,37 @@ class LidlApiScraper:
     Much cleaner than HTML parsing - returns structured JSON.
     """
     
+    _API_HEADERS = {
+        "Accept": "application/json",
+        "Accept-Language": "bg-BG,bg;q=0.9,en;q=0.8",
+        "Referer": "https://www.lidl.bg/c/hrani-i-napitki/c10068374"
+    }
+    
     def __init__(self, db_path: Optional[Path] = None):
         self.db_path = db_path or Path(__file__).parent.parent.parent.parent / "data" / "promobg.db"
         self.products: List[LidlProduct] = []
-        self.seen_ids: Set[str] = set()
+        # ~2 bytes/ID instead of a str per product; a 0.1% chance of dropping a
+        # product as a false duplicate is fine for best-effort dedup
+        if ScalableBloomFilter is not None:
+            self.seen_ids = ScalableBloomFilter(initial_capacity=100_000, error_rate=0.001)
+        else:
+            self.seen_ids: Set[str] = set()
         
         # Infrastructure setup
         self.session_manager = SessionManager(config=SessionConfig(
             max_requests=100,
             max_age_seconds=300,
-            cookie_persistence=True
+            cookie_persistence=True,
+            pool_connections=4,  # one host, but keep room for redirects/CDN
+            pool_maxsize=32,  # keep-alive connections reused across offset pages
+            extra_headers=self._API_HEADERS,  # set per session, not merged into every request
         ))
         
-        self.rate_limiter = DomainRateLimiter()
-        # Uses default config for lidl.bg (10 req/min, 3s min delay)
+        # Token bucket: 10 req/min on average, but up to 10 back-to-back after an
+        # idle spell (e.g. the first pages after a coffee break)
+        self.rate_limiter = TokenBucketDomainRateLimiter(
+            default_config=RateLimitConfig(requests_per_minute=10, burst_size=10)
+        )
         
         self.circuit_breaker = CircuitBreaker(name="lidl_api")
         
@@ -132,11 +180,18 @@ class LidlApiScraper:
         # Remove "≈" and "/опаковка" suffix
         text = packaging_text.replace("≈", "").replace("/опаковка", "").strip()
         
-        # Try standard patterns: "500 g", "1.5 l", "1 kg"
-        match = re.match(r'^([\d.,]+)\s*(g|kg|ml|l|бр)\.?$', text, re.IGNORECASE)
-        if match:
-            value_str = match.group(1).replace(",", ".")
-            unit = match.group(2).lower()
+        # Try standard patterns: "500 g", "1.5 l", "1 kg" - a leading number
+        # followed by a known unit, scanned by hand as it's far cheaper than re
+        i = 0
+        n = len(text)
+        while i < n and (text[i].isdecimal() or text[i] in ".,"):
+            i += 1
+        unit = text[i:].lstrip()
+        if unit.endswith("."):
+            unit = unit[:-1]
+        unit = unit.lower()
+        if i and unit in _SIZE_UNITS:
+            value_str = text[:i].replace(",", ".")
             try:
                 value = float(value_str)
                 clean = f"{value_str} {unit}"
@@ -161,14 +216,19 @@ class LidlApiScraper:
         if not keyfacts_html:
             return result
         
-        # Extract all <li> items
-        items = re.findall(r'<li>([^<]+)</li>', keyfacts_html)
+        # Extract all <li> items (text includes nested tags, entities decoded)
+        try:
+            fragment = lxml_html.fragment_fromstring(keyfacts_html, create_parent="div")
+        except (etree.ParserError, ValueError):
+            return result
         
-        for item in items:
-            item = item.strip()
+        for li in fragment.iter("li"):
+            item = li.text_content().strip()
+            if not item:
+                continue
             
             # Fat content: "3.5% масленост" or "4% масленост"
-            fat_match = re.search(r'([\d.,]+%)\s*масленост', item)
+            fat_match = _FAT_RE.search(item)
             if fat_match:
                 result["fat_content"] = fat_match.group(1)
                 continue
@@ -289,6 +349,14 @@ class LidlApiScraper:
         """Fetch all products from a category via API"""
         all_items = []
         offset = 0
+        params = {
+            "assortment": "BG",
+            "locale": "bg_BG",
+            "version": "v2.0.0",
+            "category.id": category_id,
+            "fetchSize": fetch_size,
+            "offset": offset
+        }
         
         while True:
             # Rate limit - wait before request
@@ -300,15 +368,7 @@ class LidlApiScraper:
                 time.sleep(60)
                 continue
             
-            params = {
-                "assortment": "BG",
-                "locale": "bg_BG",
-                "version": "v2.0.0",
-                "category.id": category_id,
-                "fetchSize": fetch_size,
-                "offset": offset
-            }
-            
+            params["offset"] = offset
             session = self.session_manager.get_session(DOMAIN)
             
             try:
@@ -316,14 +376,13 @@ class LidlApiScraper:
                     resp = session.get(
                         API_BASE,
                         params=params,
-                        timeout=30,
-                        headers={
-                            "Accept": "application/json",
-                            "Accept-Language": "bg-BG,bg;q=0.9,en;q=0.8",
-                            "Referer": "https://www.lidl.bg/c/hrani-i-napitki/c10068374"
-                        }
+                        timeout=30
                     )
+                    if resp.status_code in NON_RETRYABLE_STATUSES:
+                        raise _NonRetryable(resp.status_code)
                     resp.raise_for_status()
+                    if orjson is not None:
+                        return orjson.loads(resp.content)
                     return resp.json()
                 
                 data = self.retry_handler.execute(make_request)
@@ -346,6 +405,10 @@ class LidlApiScraper:
                 # Human-like delay
                 time.sleep(random.uniform(1.0, 2.5))
                 
+            except _NonRetryable as e:
+                # A dead category/offset says nothing about the API's health
+                logger.warning(f"Category {category_id} offset {offset}: HTTP {e}, skipping")
+                break
             except Exception as e:
                 self.circuit_breaker._on_failure()
                 logger.error(f"Failed to fetch category {category_id} offset {offset}: {e}")
@@ -353,6 +416,15 @@ class LidlApiScraper:
         
         return all_items
     
+    def _fetch_category_paced(self, category_id: str) -> List[Dict[str, Any]]:
+        """Fetch one category, then take the worker's coffee break"""
+        logger.info(f"Scraping category: {FOOD_CATEGORIES.get(category_id, category_id)}")
+        items = self._fetch_category(category_id)
+        
+        # Coffee break between categories
+        time.sleep(random.uniform(3.0, 6.0))
+        return items
+    
     def scrape_all_categories(self, categories: Optional[List[str]] = None) -> List[LidlProduct]:
         """
         Scrape all food categories.
@@ -368,19 +440,15 @@ class LidlApiScraper:
         
         logger.info(f"Starting scrape of {len(categories)} categories")
         
-        for cat_id in categories:
-            cat_name = FOOD_CATEGORIES.get(cat_id, cat_id)
-            logger.info(f"Scraping category: {cat_name}")
-            
-            items = self._fetch_category(cat_id)
-            
-            for item in items:
-                product = self._extract_product(item)
-                if product:
-                    self.products.append(product)
-            
-            # Coffee break between categories
-            time.sleep(random.uniform(3.0, 6.0))
+        # Categories are fetched in worker threads, but results are consumed in
+        # category order here, so dedup (and each product's category) stays the
+        # same as a sequential run and _extract_product needs no locking.
+        with ThreadPoolExecutor(max_workers=CATEGORY_WORKERS) as pool:
+            for items in pool.map(self._fetch_category_paced, categories):
+                for item in items:
+                    product = self._extract_product(item)
+                    if product:
+                        self.products.append(product)
         
         logger.info(f"Scrape complete: {len(self.products)} unique products")
         return self.products
@@ -392,9 +460,12 @@ class LidlApiScraper:
         
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        data = [asdict(p) for p in self.products]
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        data = [{n: getattr(p, n) for n in _FIELD_NAMES} for p in self.products]
+        if orjson is not None:
+            output_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
         
         logger.info(f"Saved {len(self.products)} products to {output_path}")
         return output_path
@@ -404,60 +475,61 @@ class LidlApiScraper:
         import sqlite3
         
         conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
         cursor = conn.cursor()
         
-        inserted = 0
-        updated = 0
+        # One lookup for every Lidl row instead of a SELECT per product
+        cursor.execute("SELECT external_id, id FROM products WHERE store_id = 2")
+        existing = dict(cursor.fetchall())
         
+        updates = []
+        inserts = {}  # external_id -> row; a repeated product keeps its last values
+        repeats = 0
         for p in self.products:
-            # Check if exists
-            cursor.execute("SELECT id FROM products WHERE store_id = 2 AND external_id = ?", (p.product_id,))
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update
-                cursor.execute("""
-                    UPDATE products SET
-                        name = ?,
-                        brand = ?,
-                        size = ?,
-                        size_unit = ?,
-                        size_value = ?,
-                        regular_price = ?,
-                        promo_price = ?,
-                        discount_percent = ?,
-                        description = ?,
-                        category = ?,
-                        image_url = ?,
-                        product_url = ?,
-                        barcode = ?,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (
-                    p.name, p.brand, p.size, p.size_unit, p.size_value,
-                    p.old_price_bgn or p.price_bgn, p.price_bgn,
-                    p.discount_percent, p.description, p.category,
-                    p.image_url, p.product_url,
-                    p.ians[0] if p.ians else None,
-                    existing[0]
-                ))
-                updated += 1
+            values = (
+                p.name, p.brand, p.size, p.size_unit, p.size_value,
+                p.old_price_bgn or p.price_bgn, p.price_bgn,
+                p.discount_percent, p.description, p.category,
+                p.image_url, p.product_url,
+                p.ians[0] if p.ians else None,
+            )
+            if p.product_id in existing:
+                updates.append(values + (existing[p.product_id],))
             else:
-                # Insert
-                cursor.execute("""
-                    INSERT INTO products (
-                        store_id, external_id, name, brand, size, size_unit, size_value,
-                        regular_price, promo_price, discount_percent, description,
-                        category, image_url, product_url, barcode
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    2, p.product_id, p.name, p.brand, p.size, p.size_unit, p.size_value,
-                    p.old_price_bgn or p.price_bgn, p.price_bgn,
-                    p.discount_percent, p.description, p.category,
-                    p.image_url, p.product_url,
-                    p.ians[0] if p.ians else None
-                ))
-                inserted += 1
+                if p.product_id in inserts:
+                    repeats += 1
+                inserts[p.product_id] = (2, p.product_id) + values
+        
+        inserted = len(inserts)
+        updated = len(updates) + repeats
+        
+        cursor.execute("BEGIN")
+        cursor.executemany("""
+            UPDATE products SET
+                name = ?,
+                brand = ?,
+                size = ?,
+                size_unit = ?,
+                size_value = ?,
+                regular_price = ?,
+                promo_price = ?,
+                discount_percent = ?,
+                description = ?,
+                category = ?,
+                image_url = ?,
+                product_url = ?,
+                barcode = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, updates)
+        cursor.executemany("""
+            INSERT INTO products (
+                store_id, external_id, name, brand, size, size_unit, size_value,
+                regular_price, promo_price, discount_percent, description,
+                category, image_url, product_url, barcode
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, list(inserts.values()))
         
         conn.commit()
         conn.close()
@@ -491,11 +563,17 @@ def main():
     print(f"{'='*50}")
     print(f"Total products: {len(products)}")
     
-    # Stats
-    with_size = sum(1 for p in products if p.size)
-    with_brand = sum(1 for p in products if p.brand)
-    with_ians = sum(1 for p in products if p.ians)
-    with_discount = sum(1 for p in products if p.discount_percent)
+    # Stats (one pass over the products)
+    with_size = with_brand = with_ians = with_discount = 0
+    for p in products:
+        if p.size:
+            with_size += 1
+        if p.brand:
+            with_brand += 1
+        if p.ians:
+            with_ians += 1
+        if p.discount_percent:
+            with_discount += 1
     
     print(f"With size: {with_size} ({100*with_size/len(products):.1f}%)")
     print(f"With brand: {with_brand} ({100*with_brand/len(products):.1f}%)")
@@ -12,24 +12,50 @@ Lidl product pages embed JSON-LD Product schema with:
 This scraper focuses on reliable JSON-LD extraction with minimal parsing.
 """
 
+import asyncio
 import gzip
+import itertools
 import json
 import logging
 import random
-import re
+import sys
 import time
 import xml.etree.ElementTree as ET
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
 from pathlib import Path
 from typing import List, Optional, Dict, Set
 import html as html_module
 
 import requests
+from lxml import etree, html as lxml_html
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+try:
+    import aiohttp
+except ImportError:  # optional, scrape_batch fetches one page at a time otherwise
+    aiohttp = None
 
 logger = logging.getLogger(__name__)
 
 SITEMAP_URL = "https://www.lidl.bg/p/export/BG/bg/product_sitemap.xml.gz"
 DOMAIN = "www.lidl.bg"
+MAX_CONCURRENCY = 8  # product pages in flight at once (aiohttp only)
+UA_ROTATE_EVERY = 10  # requests per User-Agent before moving to the next one
+
+_URL_TAG = '{http://www.sitemaps.org/schemas/sitemap/0.9}url'
+_LOC_TAG = '{http://www.sitemaps.org/schemas/sitemap/0.9}loc'
+
+# Interned JSON-LD keys/values, so lookups and compares against parsed keys can hit the identity fast path
+_TYPE = sys.intern('@type')
+_GRAPH = sys.intern('@graph')
+_PRODUCT = sys.intern('Product')
+
+_HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8', recover=True, collect_ids=False)
+_XP_JSONLD = etree.XPath("//script[@type='application/ld+json']/text()", smart_strings=False)
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -41,6 +67,9 @@ USER_AGENTS = [
 @dataclass
 class LidlProduct:
     """Product data from Lidl JSON-LD"""
+    __slots__ = ('product_id', 'name', 'brand', 'price', 'currency', 'old_price',
+                 'discount_pct', 'image_url', 'product_url', 'availability')
+    
     product_id: str
     name: str
     brand: Optional[str]
@@ -53,15 +82,24 @@ class LidlProduct:
     availability: Optional[str]
 
 
+# All fields are flat primitives, so a plain getattr copy replaces asdict()
+_FIELD_NAMES = tuple(f.name for f in fields(LidlProduct))
+
+
 class LidlJsonLdScraper:
     """
     Simple Lidl scraper focused on JSON-LD extraction.
     """
     
     def __init__(self):
+        # Fixed rotation instead of random picks, so a run's UA sequence is reproducible
+        self._ua_cycle = itertools.cycle(USER_AGENTS)
+        self._user_agent = next(self._ua_cycle)
+        self._request_count = 0
+        
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': random.choice(USER_AGENTS),
+            'User-Agent': self._user_agent,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'bg-BG,bg;q=0.9,en-US;q=0.8,en;q=0.7',
             'Accept-Encoding': 'gzip, deflate, br',
@@ -79,17 +117,23 @@ class LidlJsonLdScraper:
         logger.info(f"Fetching sitemap: {SITEMAP_URL}")
         
         try:
-            response = self.session.get(SITEMAP_URL, timeout=30)
-            response.raise_for_status()
-            
-            content = gzip.decompress(response.content).decode('utf-8')
-            root = ET.fromstring(content)
-            
-            namespace = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
             urls = []
-            for url_elem in root.findall('.//ns:loc', namespace):
-                if url_elem.text and '/p/' in url_elem.text:
-                    urls.append(url_elem.text)
+            with self.session.get(SITEMAP_URL, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                
+                # Decompress and parse as the bytes arrive rather than holding
+                # the download, the decompressed text and the tree all at once
+                response.raw.decode_content = True  # undo any transfer encoding; the .gz body stays
+                root = None
+                for event, elem in ET.iterparse(gzip.GzipFile(fileobj=response.raw), events=('start', 'end')):
+                    if root is None:
+                        root = elem
+                    elif event == 'end':
+                        if elem.tag == _LOC_TAG:
+                            if elem.text and '/p/' in elem.text:
+                                urls.append(elem.text)
+                        elif elem.tag == _URL_TAG:
+                            root.clear()  # finished <url> entries are no longer needed
             
             self.stats['urls_found'] = len(urls)
             logger.info(f"Found {len(urls)} product URLs in sitemap")
@@ -102,16 +146,21 @@ class LidlJsonLdScraper:
     def _extract_jsonld(self, html: str) -> List[dict]:
         """Extract all JSON-LD objects from HTML"""
         jsonld_objects = []
+        if not html:
+            return jsonld_objects
         
         # Find all JSON-LD script tags
-        pattern = r'<script\s+type=["\']?application/ld\+json["\']?\s*>(.+?)</script>'
+        try:
+            doc = lxml_html.document_fromstring(html.encode('utf-8'), parser=_HTML_PARSER)
+        except etree.ParserError as e:
+            logger.debug(f"Failed to parse HTML: {e}")
+            return jsonld_objects
         
-        for match in re.finditer(pattern, html, re.DOTALL | re.IGNORECASE):
+        for content in _XP_JSONLD(doc):
             try:
-                content = match.group(1).strip()
-                data = json.loads(content)
+                data = orjson.loads(content) if orjson is not None else json.loads(content.strip())
                 jsonld_objects.append(data)
-            except json.JSONDecodeError as e:
+            except json.JSONDecodeError as e:  # also raised by orjson
                 logger.debug(f"Failed to parse JSON-LD: {e}")
                 continue
         
@@ -120,28 +169,35 @@ class LidlJsonLdScraper:
     def _find_product_jsonld(self, jsonld_objects: List[dict]) -> Optional[dict]:
         """Find the Product schema from JSON-LD objects"""
         for obj in jsonld_objects:
-            if isinstance(obj, dict):
-                if obj.get('@type') == 'Product':
-                    return obj
-                if '@graph' in obj:
-                    for item in obj['@graph']:
-                        if item.get('@type') == 'Product':
-                            return item
+            if not isinstance(obj, dict):
+                continue
+            if obj.get(_TYPE) == _PRODUCT:
+                return obj
+            graph = obj.get(_GRAPH)
+            if graph:
+                for item in graph:
+                    if isinstance(item, dict) and item.get(_TYPE) == _PRODUCT:
+                        return item
         return None
     
+    def _next_user_agent(self) -> str:
+        """User-Agent for the next request, advancing every UA_ROTATE_EVERY requests"""
+        self._request_count += 1
+        if self._request_count % UA_ROTATE_EVERY == 0:
+            self._user_agent = next(self._ua_cycle)
+        return self._user_agent
+    
     def scrape_product_page(self, url: str) -> Optional[LidlProduct]:
         """Scrape product page and extract JSON-LD data"""
         
         try:
             time.sleep(random.uniform(1.0, 3.0))
             
-            if random.random() < 0.1:
-                self.session.headers['User-Agent'] = random.choice(USER_AGENTS)
-            
+            self.session.headers['User-Agent'] = self._next_user_agent()
             response = self.session.get(url, timeout=20)
             
-            if response.status_code == 404:
-                logger.debug(f"Product not found (404): {url}")
+            if response.status_code in (404, 410):
+                logger.debug(f"Product not found ({response.status_code}): {url}")
                 return None
             
             if response.status_code != 200:
@@ -149,7 +205,20 @@ class LidlJsonLdScraper:
                 self.stats['failures'] += 1
                 return None
             
-            html = response.text
+            return self._parse_product_page(response.text, url)
+            
+        except requests.exceptions.Timeout:
+            logger.warning(f"Timeout: {url}")
+            self.stats['failures'] += 1
+            return None
+        except Exception as e:
+            logger.error(f"Error scraping {url}: {e}")
+            self.stats['failures'] += 1
+            return None
+    
+    def _parse_product_page(self, html: str, url: str) -> Optional[LidlProduct]:
+        """Build a LidlProduct from a product page's JSON-LD"""
+        try:
             jsonld_objects = self._extract_jsonld(html)
             
             if not jsonld_objects:
@@ -213,17 +282,73 @@ class LidlJsonLdScraper:
                 availability=availability,
             )
             
-        except requests.exceptions.Timeout:
-            logger.warning(f"Timeout: {url}")
-            self.stats['failures'] += 1
-            return None
         except Exception as e:
             logger.error(f"Error scraping {url}: {e}")
             self.stats['failures'] += 1
             return None
     
+    async def _scrape_one(self, http: "aiohttp.ClientSession", url: str,
+                          sem: asyncio.Semaphore) -> Optional[LidlProduct]:
+        """Async scrape_product_page; sem bounds the requests in flight"""
+        async with sem:
+            try:
+                await asyncio.sleep(random.uniform(0.1, 0.5))
+                
+                # Per request: the aiohttp session's headers are shared by every task
+                async with http.get(url, headers={'User-Agent': self._next_user_agent()}) as response:
+                    if response.status in (404, 410):
+                        logger.debug(f"Product not found ({response.status}): {url}")
+                        return None
+                    
+                    if response.status != 200:
+                        logger.warning(f"HTTP {response.status} for {url}")
+                        self.stats['failures'] += 1
+                        return None
+                    
+                    html = await response.text()
+                    
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout: {url}")
+                self.stats['failures'] += 1
+                return None
+            except Exception as e:
+                logger.error(f"Error scraping {url}: {e}")
+                self.stats['failures'] += 1
+                return None
+        
+        return self._parse_product_page(html, url)
+    
+    async def scrape_batch_async(self, urls: List[str], progress_interval: int = 25) -> List[LidlProduct]:
+        """Scrape a batch of URLs, MAX_CONCURRENCY at a time"""
+        total = len(urls)
+        done = 0
+        found = 0
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+        
+        # aiohttp negotiates its own Accept-Encoding
+        headers = {k: v for k, v in self.session.headers.items() if k != 'Accept-Encoding'}
+        connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=20)
+        
+        async def scrape_and_count(url: str) -> Optional[LidlProduct]:
+            nonlocal done, found
+            product = await self._scrape_one(http, url, sem)
+            done += 1
+            found += product is not None
+            if done % progress_interval == 0:
+                logger.info(f"Progress: {done}/{total} ({found} products)")
+            return product
+        
+        async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as http:
+            results = await asyncio.gather(*[scrape_and_count(url) for url in urls])
+        
+        return [p for p in results if p]
+    
     def scrape_batch(self, urls: List[str], progress_interval: int = 25) -> List[LidlProduct]:
         """Scrape a batch of URLs"""
+        if aiohttp is not None:
+            return asyncio.run(self.scrape_batch_async(urls, progress_interval))
+        
         products = []
         total = len(urls)
         
@@ -244,12 +369,15 @@ class LidlJsonLdScraper:
     
     def save_products(self, products: List[LidlProduct], filepath: str):
         """Save products to JSON"""
-        data = [asdict(p) for p in products]
+        data = [{n: getattr(p, n) for n in _FIELD_NAMES} for p in products]
         
         Path(filepath).parent.mkdir(parents=True, exist_ok=True)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            Path(filepath).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
         logger.info(f"Saved {len(products)} products to {filepath}")
 
 
@@ -2,17 +2,71 @@
 Lidl.bg Offers Scraper - Uses category pages (not sitemap)
 Updated Feb 2026 after Lidl removed sitemap.xml
 """
+import asyncio
+import hashlib
+import os
+import sys
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from lxml import etree, html as lxml_html
 import json
 import re
 import time
 import random
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
 from typing import List, Optional
+from urllib.parse import urljoin
 
-@dataclass
+try:
+    import aiohttp
+except ImportError:  # optional, categories are fetched one at a time otherwise
+    aiohttp = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+try:
+    import diskcache
+except ImportError:  # optional, every run fetches all pages otherwise
+    diskcache = None
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from services.scraper.core.rate_limiter import TokenBucketRateLimiter
+
+MAX_CONCURRENCY = 5  # category pages in flight at once (aiohttp only)
+
+_PRICE_RE = re.compile(r'(\d+[,.]\d+)')
+
+# lxml (C parser + compiled XPath) instead of BeautifulSoup's html.parser
+_HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8', recover=True, collect_ids=False)
+_XP_HREFS = etree.XPath("//a/@href", smart_strings=False)
+_XP_JSONLD = etree.XPath("//script[@type='application/ld+json']/text()", smart_strings=False)
+_XP_TILES = etree.XPath("//*[contains(@class, 'product-tile') or contains(@class, 'product-item')]")
+# Single-shot tile lookups: compiled once, the [1] lets libxml2 stop at the first hit
+_XP_TILE_NAME = etree.XPath("(.//*[contains(@class, 'title') or contains(@class, 'name') or self::h3 or self::h4])[1]")
+_XP_TILE_PRICE = etree.XPath("(.//*[contains(@class, 'price')])[1]")
+_XP_TILE_LINK = etree.XPath("(.//a[contains(@href, '/p/')])[1]")
+
+
+def _first(xpath: etree.XPath, el):
+    """First match of a compiled XPath, or None"""
+    found = xpath(el)
+    return found[0] if found else None
+
+
+def _stripped_text(el) -> str:
+    """Text of el with each piece stripped and joined, like bs4's get_text(strip=True)"""
+    return ''.join(t.strip() for t in el.itertext())
+
+# slots=True needs Python 3.10 (defaults rule out writing __slots__ by hand); 3.9 gets a __dict__
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class LidlProduct:
     name: str
     price_eur: Optional[float]
@@ -25,6 +79,9 @@ class LidlProduct:
     category: Optional[str] = None
     brand: Optional[str] = None
 
+# All fields are flat primitives, so a plain getattr copy replaces asdict()
+_FIELD_NAMES = tuple(f.name for f in fields(LidlProduct))
+
 class LidlOffersScraper:
     BASE_URL = "https://www.lidl.bg"
     EUR_BGN = 1.9558
@@ -38,8 +95,21 @@ class LidlOffersScraper:
         "/c/bebe-dete-i-igrachki/s10068225",
     ]
     
+    # Fetched pages are reused for an hour, so re-runs skip the network (diskcache only)
+    PAGE_CACHE_DIR = Path(__file__).parent.parent / "data" / "cache" / "lidl_offers"
+    PAGE_CACHE_EXPIRE = 3600  # seconds
+    # Parsed products are kept per URL with a digest of the body they came from;
+    # an unchanged page on a later run reuses them instead of being parsed again
+    PARSED_CACHE_EXPIRE = 7 * 24 * 3600  # seconds
+    
+    # Token bucket shared by the async workers: 5 requests per 10 s on average, in bursts of up to 5
+    REQUESTS_PER_SECOND = 0.5
+    BURST = 5
+    
     def __init__(self):
         self.session = requests.Session()
+        # One keep-alive pool for the whole run, so TCP+TLS to lidl.bg is paid once
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENCY))
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -47,104 +117,209 @@ class LidlOffersScraper:
         })
         self.products = []
         self.seen_names = set()
+        self.page_cache = diskcache.Cache(str(self.PAGE_CACHE_DIR)) if diskcache is not None else None
+        self._parse_pool = None  # set while the async crawl runs
+        self.rate_limiter = TokenBucketRateLimiter(rate=self.REQUESTS_PER_SECOND, capacity=self.BURST)
     
     def _delay(self):
         """Gaussian delay for human-like behavior"""
         delay = max(2.0, random.gauss(4.0, 1.5))
         time.sleep(delay)
     
-    def _parse_price(self, text: str) -> Optional[float]:
+    def _cached(self, url: str) -> Optional[bytes]:
+        """Body of a page fetched within PAGE_CACHE_EXPIRE, if any"""
+        return self.page_cache.get(url) if self.page_cache is not None else None
+    
+    def _remember(self, url: str, body: bytes):
+        """Cache a successfully fetched page body"""
+        if self.page_cache is not None:
+            self.page_cache.set(url, body, expire=self.PAGE_CACHE_EXPIRE)
+    
+    @staticmethod
+    def _parse_price(text: str) -> Optional[float]:
         if not text:
             return None
-        match = re.search(r'([\d]+[,.][\d]+)', text.replace(' ', ''))
+        match = _PRICE_RE.search(text.replace(' ', ''))
         if match:
             return float(match.group(1).replace(',', '.'))
         return None
     
-    def _extract_from_jsonld(self, soup: BeautifulSoup) -> List[dict]:
+    @staticmethod
+    def _extract_from_jsonld(doc) -> List[dict]:
         """Extract products from JSON-LD data"""
         products = []
-        for script in soup.find_all('script', type='application/ld+json'):
+        loads = orjson.loads if orjson is not None else json.loads
+        for text in _XP_JSONLD(doc):
             try:
-                data = json.loads(script.string)
+                data = loads(text)
+                if not isinstance(data, dict):
+                    continue
                 if data.get('@type') == 'ItemList':
                     for item in data.get('itemListElement', []):
-                        if 'item' in item:
+                        if isinstance(item, dict) and 'item' in item:
                             products.append(item['item'])
                 elif data.get('@type') == 'Product':
                     products.append(data)
-            except:
+            except (ValueError, TypeError):  # bad JSON (orjson's error is a ValueError too) or odd shapes
                 pass
         return products
     
-    def _scrape_category(self, url: str, category_name: str = None) -> int:
-        """Scrape a single category page"""
-        full_url = self.BASE_URL + url if url.startswith('/') else url
+    @classmethod
+    def _parse_category(cls, content: bytes, category_name: Optional[str]) -> List[LidlProduct]:
+        """Parse a category page into products, JSON-LD ones first (not yet deduplicated)"""
+        doc = lxml_html.document_fromstring(content, parser=_HTML_PARSER)
+        found = []
         
-        try:
-            self._delay()
-            resp = self.session.get(full_url, timeout=20)
-            if resp.status_code != 200:
-                print(f"  {url}: Status {resp.status_code}")
-                return 0
+        # Try JSON-LD first (byte prescan: most listing pages carry none, so skip the tree walk)
+        jsonld_products = cls._extract_from_jsonld(doc) if b'application/ld+json' in content else []
+        for p in jsonld_products:
+            name = p.get('name', '')
+            if not name:
+                continue
             
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            count = 0
+            offers = p.get('offers', {})
+            price = cls._parse_price(str(offers.get('price', '')))
             
-            # Try JSON-LD first
-            jsonld_products = self._extract_from_jsonld(soup)
-            for p in jsonld_products:
-                name = p.get('name', '')
-                if not name or name.lower() in self.seen_names:
-                    continue
-                
-                offers = p.get('offers', {})
-                price = self._parse_price(str(offers.get('price', '')))
-                
-                self.products.append(LidlProduct(
-                    name=name,
-                    price_eur=price,
-                    price_bgn=price * self.EUR_BGN if price else None,
-                    image_url=p.get('image'),
-                    product_url=p.get('url'),
-                    category=category_name,
-                    brand=p.get('brand', {}).get('name') if isinstance(p.get('brand'), dict) else p.get('brand'),
-                ))
-                self.seen_names.add(name.lower())
-                count += 1
+            found.append(LidlProduct(
+                name=name,
+                price_eur=price,
+                price_bgn=price * cls.EUR_BGN if price else None,
+                image_url=p.get('image'),
+                product_url=p.get('url'),
+                category=category_name,
+                brand=p.get('brand', {}).get('name') if isinstance(p.get('brand'), dict) else p.get('brand'),
+            ))
+        
+        # Also look for product tiles in HTML
+        for tile in _XP_TILES(doc):
+            name_el = _first(_XP_TILE_NAME, tile)
+            if name_el is None:
+                continue
+            name = _stripped_text(name_el)
+            if not name:
+                continue
             
-            # Also look for product tiles in HTML
-            for tile in soup.select('[class*="product-tile"], [class*="product-item"]'):
-                name_el = tile.select_one('[class*="title"], [class*="name"], h3, h4')
-                if not name_el:
-                    continue
-                name = name_el.get_text(strip=True)
-                if not name or name.lower() in self.seen_names:
-                    continue
-                
-                price_el = tile.select_one('[class*="price"]')
-                price = self._parse_price(price_el.get_text() if price_el else '')
-                
-                img = tile.select_one('img')
-                link = tile.select_one('a[href*="/p/"]')
-                
-                self.products.append(LidlProduct(
-                    name=name,
-                    price_eur=price,
-                    price_bgn=price * self.EUR_BGN if price else None,
-                    image_url=img.get('src') if img else None,
-                    product_url=link.get('href') if link else None,
-                    category=category_name,
-                ))
-                self.seen_names.add(name.lower())
-                count += 1
+            price_el = _first(_XP_TILE_PRICE, tile)
+            price = cls._parse_price(price_el.text_content() if price_el is not None else '')
             
-            return count
+            img = tile.find('.//img')  # ElementPath stops at the first match
+            link = _first(_XP_TILE_LINK, tile)
+            
+            found.append(LidlProduct(
+                name=name,
+                price_eur=price,
+                price_bgn=price * cls.EUR_BGN if price else None,
+                image_url=img.get('src') if img is not None else None,
+                product_url=link.get('href') if link is not None else None,
+                category=category_name,
+            ))
+        
+        return found
+    
+    def _parsed_from_cache(self, url: str, content: bytes,
+                           category_name: Optional[str]) -> tuple:
+        """(digest of content, products parsed from it before or None)"""
+        if self.page_cache is None:
+            return None, None
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        entry = self.page_cache.get(('parsed', url))  # (digest, category_name, product field tuples)
+        if entry is not None and entry[0] == digest and entry[1] == category_name:
+            return digest, [LidlProduct(*row) for row in entry[2]]
+        return digest, None
+    
+    def _remember_parsed(self, url: str, digest: Optional[bytes], category_name: Optional[str],
+                         found: List[LidlProduct]):
+        """Store the products parsed from the body with this digest"""
+        if self.page_cache is None:
+            return
+        # Plain tuples, so the cache doesn't depend on the module path LidlProduct was pickled under
+        rows = [tuple(getattr(p, n) for n in _FIELD_NAMES) for p in found]
+        self.page_cache.set(('parsed', url), (digest, category_name, rows), expire=self.PARSED_CACHE_EXPIRE)
+    
+    def _parse_category_cached(self, url: str, content: bytes, category_name: Optional[str]) -> List[LidlProduct]:
+        """_parse_category, reusing the last result for url if its body hasn't changed"""
+        digest, found = self._parsed_from_cache(url, content, category_name)
+        if found is None:
+            found = self._parse_category(content, category_name)
+            self._remember_parsed(url, digest, category_name, found)
+        return found
+    
+    def _merge(self, found: List[LidlProduct]) -> int:
+        """Keep products whose name hasn't been seen yet; returns how many were added"""
+        batch = []
+        for product in found:
+            lname = product.name.lower()
+            if lname in self.seen_names:
+                continue
+            self.seen_names.add(lname)
+            batch.append(product)
+        self.products.extend(batch)
+        return len(batch)
+    
+    def _scrape_category(self, full_url: str, category_name: str = None) -> int:
+        """Scrape a single category page (full_url already absolute)"""
+        try:
+            content = self._cached(full_url)
+            if content is None:
+                self._delay()
+                resp = self.session.get(full_url, timeout=20)
+                if resp.status_code != 200:
+                    print(f"  {full_url}: Status {resp.status_code}")
+                    return 0
+                content = resp.content
+                self._remember(full_url, content)
+            
+            return self._merge(self._parse_category_cached(full_url, content, category_name))
             
         except Exception as e:
             print(f"  Error: {e}")
             return 0
     
+    async def _afetch_category(self, http: "aiohttp.ClientSession", sem: asyncio.Semaphore,
+                               full_url: str, category_name: Optional[str]) -> Optional[List[LidlProduct]]:
+        """Fetch and parse one category page; sem bounds the pages in flight"""
+        try:
+            content = self._cached(full_url)
+            if content is None:
+                async with sem:
+                    await asyncio.sleep(self.rate_limiter.reserve())
+                    async with http.get(full_url) as resp:
+                        if resp.status != 200:
+                            print(f"  {full_url}: Status {resp.status}")
+                            return None
+                        content = await resp.read()
+                self._remember(full_url, content)
+            
+            digest, found = self._parsed_from_cache(full_url, content, category_name)
+            if found is None:
+                # Parse in the worker pool so tile extraction doesn't hold the GIL while others download
+                loop = asyncio.get_running_loop()
+                found = await loop.run_in_executor(self._parse_pool, parse_category, content, category_name)
+                self._remember_parsed(full_url, digest, category_name, found)
+            return found
+            
+        except Exception as e:
+            print(f"  Error: {e}")
+            return None
+    
+    async def _scrape_categories_async(self, jobs: List[tuple]) -> None:
+        """Fetch all (url, category) jobs concurrently, parsing on all cores, merging results in job order"""
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+        # aiohttp negotiates its own Accept-Encoding
+        headers = {k: v for k, v in self.session.headers.items() if k != 'Accept-Encoding'}
+        timeout = aiohttp.ClientTimeout(total=20)
+        connector = aiohttp.TCPConnector(limit_per_host=MAX_CONCURRENCY, keepalive_timeout=30)
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as self._parse_pool:
+            async with aiohttp.ClientSession(headers=headers, timeout=timeout, connector=connector) as http:
+                results = await asyncio.gather(*[
+                    self._afetch_category(http, sem, url, category_name) for url, category_name in jobs
+                ])
+        
+        # Merging in job order keeps dedup identical to the serial crawl
+        for (url, _), found in zip(jobs, results):
+            count = self._merge(found) if found else 0
+            print(f"  {url}: {count} products")
+    
     def scrape(self) -> List[LidlProduct]:
         """Main scraping method"""
         print("Lidl Offers Scraper (Category-based)")
@@ -152,16 +327,18 @@ class LidlOffersScraper:
         
         # First get all category links from homepage
         try:
-            resp = self.session.get(self.BASE_URL, timeout=20)
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            homepage = self._cached(self.BASE_URL)
+            if homepage is None:
+                resp = self.session.get(self.BASE_URL, timeout=20)
+                homepage = resp.content
+                if resp.status_code == 200:
+                    self._remember(self.BASE_URL, homepage)
             
+            # Every href made absolute in one pass; dict keys dedupe and keep page order for the [:10] cut
+            doc = lxml_html.document_fromstring(homepage, parser=_HTML_PARSER) if homepage else None
+            hrefs = dict.fromkeys(urljoin(self.BASE_URL, h) for h in _XP_HREFS(doc)) if doc is not None else {}
             # Find offer links (a10... are usually offers)
-            offer_links = []
-            for a in soup.find_all('a', href=True):
-                href = a['href']
-                if '/c/a10' in href:  # Offer pages
-                    if href not in offer_links:
-                        offer_links.append(href)
+            offer_links = [h for h in hrefs if '/c/a10' in h]
             
             print(f"Found {len(offer_links)} offer category links")
             self._delay()
@@ -169,15 +346,16 @@ class LidlOffersScraper:
             print(f"Homepage error: {e}")
             offer_links = []
         
-        # Scrape offer categories first
-        for url in offer_links[:10]:  # Limit to 10 categories
-            count = self._scrape_category(url, "offers")
-            print(f"  {url}: {count} products")
+        # Offer categories first (limit to 10), then the main categories
+        jobs = [(url, "offers") for url in offer_links[:10]]
+        jobs += [(urljoin(self.BASE_URL, url), url.split('/')[-2]) for url in self.CATEGORY_URLS]
         
-        # Then scrape main categories
-        for url in self.CATEGORY_URLS:
-            count = self._scrape_category(url, url.split('/')[-2])
-            print(f"  {url}: {count} products")
+        if aiohttp is not None:
+            asyncio.run(self._scrape_categories_async(jobs))
+        else:
+            for url, category_name in jobs:
+                count = self._scrape_category(url, category_name)
+                print(f"  {url}: {count} products")
         
         print(f"\nTotal: {len(self.products)} unique products")
         return self.products
@@ -186,10 +364,20 @@ class LidlOffersScraper:
         if filepath is None:
             filepath = Path(__file__).parent.parent / "data" / "lidl_products.json"
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump([asdict(p) for p in self.products], f, ensure_ascii=False, indent=2)
+        data = [{n: getattr(p, n) for n in _FIELD_NAMES} for p in self.products]
+        if orjson is not None:
+            Path(filepath).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
         print(f"Saved to {filepath}")
 
+
+def parse_category(content: bytes, category_name: Optional[str]) -> List[LidlProduct]:
+    """LidlOffersScraper._parse_category; top-level so it can run in a worker process"""
+    return LidlOffersScraper._parse_category(content, category_name)
+
+
 if __name__ == "__main__":
     scraper = LidlOffersScraper()
     scraper.scrape()
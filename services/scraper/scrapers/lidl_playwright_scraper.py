@@ -13,6 +13,10 @@ import re
 import os
 from datetime import datetime
 from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urljoin
+
+from lxml import etree, html as lxml_html
 
 os.environ['PLAYWRIGHT_BROWSERS_PATH'] = '/host-workspace/.playwright-browsers'
 
@@ -22,14 +26,159 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+MAX_CONCURRENCY = 4  # pages rendered at once, each in its own browser context
+MAX_URLS = 40
+COFFEE_EVERY = 15  # pages between coffee breaks
+PRODUCT_SELECTOR = '[class*="product"], [class*="tile"]'  # first tiles rendered = page is usable
+
+_HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8', recover=True, collect_ids=False)
+
+
+def _class_has(*needles: str) -> str:
+    """XPath predicate: class attribute contains any of the substrings (CSS [class*=...])"""
+    return ' or '.join(f"contains(@class, '{n}')" for n in needles)
+
+
+# Whole scroll loop in one page.evaluate: 200-500px steps with 0.2-0.5s pauses, then back to the top
+_HUMAN_SCROLL_JS = """async () => {
+    const total = document.body.scrollHeight;
+    let current = 0;
+    while (current < total) {
+        current += 200 + Math.floor(Math.random() * 301);
+        window.scrollTo(0, current);
+        await new Promise(r => setTimeout(r, 200 + Math.random() * 300));
+    }
+    window.scrollTo(0, 0);
+}"""
+
+# Same selectors the in-page extractor used, as compiled XPath (document order, like querySelectorAll)
+_XP_CONTAINERS = etree.XPath(
+    f"//*[{_class_has('product', 'Product', 'tile', 'Tile', 'item', 'Item')} or self::article"
+    f" or (self::div and parent::*[{_class_has('grid', 'Grid')}])]"
+)
+_XP_PRICE = etree.XPath(f"(.//*[{_class_has('price', 'Price', 'cost', 'Cost')} or @data-price])[1]")
+_XP_NAME = etree.XPath(
+    f"(.//*[{_class_has('title', 'Title', 'name', 'Name', 'heading')} or self::h2 or self::h3 or self::h4])[1]"
+)
+_XP_LINK = etree.XPath("(.//a[contains(@href, '/p/') or contains(@href, '/c/')])[1]")
+_XP_JSONLD = etree.XPath("//script[@type='application/ld+json']")
+_PRICE_RE = re.compile(r'(\d+)[.,](\d+)')
+_FLOAT_PREFIX_RE = re.compile(r'\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)')
+_PUNCT_RE = re.compile(r'[^\w\s]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _canon(name: str) -> str:
+    """Dedup key for a product name: lowercased, punctuation dropped, whitespace collapsed"""
+    return _SPACE_RE.sub(' ', _PUNCT_RE.sub('', name.lower())).strip()
+
+
+def _parse_float(value) -> Optional[float]:
+    """JavaScript parseFloat: leading number of a string, or None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = _FLOAT_PREFIX_RE.match(str(value))
+    return float(match.group(1)) if match else None
+
+
+def extract_rendered_products(html: str, base_url: str) -> List[dict]:
+    """Extract products from a rendered page's HTML (page.content())"""
+    results = []
+    try:
+        doc = lxml_html.document_fromstring(html.encode('utf-8'), parser=_HTML_PARSER)
+    except etree.ParserError:
+        return results
+    
+    # Strategy 1: Find all potential product containers
+    for el in _XP_CONTAINERS(doc):
+        price_els = _XP_PRICE(el)
+        name_els = _XP_NAME(el)
+        name = name_els[0].text_content().strip() if name_els else ''
+        
+        # Only add if we found meaningful content
+        if not (price_els or len(name) > 3):
+            continue
+        
+        price_text = price_els[0].text_content().strip() if price_els else el.text_content()
+        
+        # Extract price from text
+        match = _PRICE_RE.search(price_text)
+        price = float(f"{match.group(1)}.{match.group(2)}") if match else None
+        
+        if name and 2 < len(name) < 200:
+            links = _XP_LINK(el)
+            results.append({
+                'name': name,
+                'price': price,
+                'price_text': price_text[:50],
+                'url': urljoin(base_url, links[0].get('href')) if links else '',
+            })
+    
+    # Strategy 2: Look for structured data
+    for script in _XP_JSONLD(doc):
+        try:
+            data = json.loads(script.text_content())
+            if not isinstance(data, dict):
+                continue
+            if data.get('@type') == 'Product':
+                offers = data.get('offers') or {}
+                price = offers.get('price') if isinstance(offers, dict) else None
+                if not price and isinstance(offers, list) and offers:
+                    price = offers[0].get('price')
+                brand = data.get('brand')
+                results.append({
+                    'name': data.get('name') or '',
+                    'price': _parse_float(price) if price else None,
+                    'url': data.get('url') or '',
+                    'brand': (brand.get('name') if isinstance(brand, dict) else None) or brand or '',
+                    'source': 'jsonld'
+                })
+            for item in data.get('@graph') or []:
+                if item.get('@type') == 'Product':
+                    offers = item.get('offers') or {}
+                    price = offers.get('price') if isinstance(offers, dict) else None
+                    results.append({
+                        'name': item.get('name') or '',
+                        'price': _parse_float(price) if price else None,
+                        'url': item.get('url') or '',
+                        'source': 'jsonld'
+                    })
+        except (ValueError, TypeError, AttributeError):  # like the old in-page catch {}
+            pass
+    
+    return results
+
+
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'locale': 'bg-BG',
+}
+
+# Never needed for extraction; stylesheets stay so layout (and lazy loading on scroll) behaves normally
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font'})
+
+
+async def _block_heavy_resources(route):
+    """Abort image/media/font requests, let everything else through"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
 
 
-async def apply_stealth(page):
-    """Apply stealth settings to avoid bot detection"""
+async def apply_stealth(context):
+    """Apply stealth settings to avoid bot detection (once per context, covers all its pages)"""
     
     # Override webdriver detection
-    await page.add_init_script("""
+    await context.add_init_script("""
         // Overwrite the 'webdriver' property
         Object.defineProperty(navigator, 'webdriver', {
             get: () => undefined,
@@ -70,6 +219,9 @@ class LidlPlaywrightScraper:
         self.seen_names = set()
         self.base_url = "https://www.lidl.bg"
         self.output_file = Path(__file__).parent.parent / "data" / "lidl_products.json"
+        # One JSON object per line, appended as products are found, so a crashed run keeps its progress
+        self.stream_file = self.output_file.with_suffix('.ndjson')
+        self._out = None
         
         self.stats = {
             'pages_visited': 0,
@@ -86,113 +238,19 @@ class LidlPlaywrightScraper:
     
     async def human_scroll(self, page):
         """Simulate human scrolling"""
-        total_height = await page.evaluate("document.body.scrollHeight")
-        current = 0
-        
-        while current < total_height:
-            scroll = random.randint(200, 500)
-            current += scroll
-            await page.evaluate(f"window.scrollTo(0, {current})")
-            await asyncio.sleep(random.uniform(0.2, 0.5))
-        
-        await page.evaluate("window.scrollTo(0, 0)")
+        await page.evaluate(_HUMAN_SCROLL_JS)
         await asyncio.sleep(0.3)
     
     async def extract_products(self, page):
         """Extract products from rendered page"""
         
-        # Wait for content
-        await asyncio.sleep(2)
-        
         # Scroll to load lazy content
         await self.human_scroll(page)
         await asyncio.sleep(1)
         
-        # Try to extract products using multiple strategies
-        products = await page.evaluate('''() => {
-            const results = [];
-            
-            // Strategy 1: Find all potential product containers
-            const containers = document.querySelectorAll(
-                '[class*="product"], [class*="Product"], ' +
-                '[class*="tile"], [class*="Tile"], ' +
-                '[class*="item"], [class*="Item"], ' +
-                '[class*="grid"] > div, [class*="Grid"] > div, ' +
-                'article'
-            );
-            
-            containers.forEach(el => {
-                // Look for price indicators
-                const priceEl = el.querySelector(
-                    '[class*="price"], [class*="Price"], ' +
-                    '[class*="cost"], [class*="Cost"], ' +
-                    '[data-price], .pricefield'
-                );
-                
-                // Look for title/name
-                const nameEl = el.querySelector(
-                    '[class*="title"], [class*="Title"], ' +
-                    '[class*="name"], [class*="Name"], ' +
-                    'h2, h3, h4, [class*="heading"]'
-                );
-                
-                // Look for link
-                const linkEl = el.querySelector('a[href*="/p/"], a[href*="/c/"]');
-                
-                // Only add if we found meaningful content
-                if (priceEl || (nameEl && nameEl.textContent.trim().length > 3)) {
-                    const name = nameEl ? nameEl.textContent.trim() : '';
-                    const priceText = priceEl ? priceEl.textContent.trim() : el.textContent;
-                    
-                    // Extract price from text
-                    const priceMatch = priceText.match(/(\\d+)[.,](\\d+)/);
-                    const price = priceMatch ? parseFloat(priceMatch[1] + '.' + priceMatch[2]) : null;
-                    
-                    if (name && name.length > 2 && name.length < 200) {
-                        results.push({
-                            name: name,
-                            price: price,
-                            price_text: priceText.substring(0, 50),
-                            url: linkEl ? linkEl.href : '',
-                        });
-                    }
-                }
-            });
-            
-            // Strategy 2: Look for structured data
-            const scripts = document.querySelectorAll('script[type="application/ld+json"]');
-            scripts.forEach(script => {
-                try {
-                    const data = JSON.parse(script.textContent);
-                    if (data['@type'] === 'Product') {
-                        const offers = data.offers || {};
-                        const price = offers.price || (Array.isArray(offers) ? offers[0]?.price : null);
-                        results.push({
-                            name: data.name || '',
-                            price: price ? parseFloat(price) : null,
-                            url: data.url || '',
-                            brand: data.brand?.name || data.brand || '',
-                            source: 'jsonld'
-                        });
-                    }
-                    if (data['@graph']) {
-                        data['@graph'].forEach(item => {
-                            if (item['@type'] === 'Product') {
-                                const offers = item.offers || {};
-                                results.push({
-                                    name: item.name || '',
-                                    price: offers.price ? parseFloat(offers.price) : null,
-                                    url: item.url || '',
-                                    source: 'jsonld'
-                                });
-                            }
-                        });
-                    }
-                } catch {}
-            });
-            
-            return results;
-        }''')
+        # Parse the rendered DOM here rather than shipping an extractor through page.evaluate
+        html = await page.content()
+        products = await asyncio.to_thread(extract_rendered_products, html, page.url)
         
         return products
     
@@ -231,16 +289,30 @@ class LidlPlaywrightScraper:
         logger.info(f"Found {len(all_urls)} category/offer URLs")
         return all_urls
     
-    async def scrape_url(self, page, url):
-        """Scrape a single URL"""
+    async def new_context(self, browser):
+        """Browser context with the stealth scripts and resource blocking registered"""
+        context = await browser.new_context(**CONTEXT_OPTIONS)
+        await apply_stealth(context)
+        await context.route("**/*", _block_heavy_resources)
+        return context
+    
+    async def scrape_url(self, context, url):
+        """Scrape a single URL in a throwaway page of context"""
         if url in self.seen_urls:
             return 0
         self.seen_urls.add(url)
         
         logger.info(f"Scraping: {url}")
         
+        page = None
         try:
-            await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            page = await context.new_page()
+            # Don't sit through Lidl's analytics scripts; wait for the tiles themselves instead
+            await page.goto(url, wait_until='commit', timeout=15000)
+            try:
+                await page.wait_for_selector(PRODUCT_SELECTOR, timeout=8000)
+            except PlaywrightTimeoutError:
+                pass
             await self.random_delay(2, 4)
             
             products = await self.extract_products(page)
@@ -248,11 +320,17 @@ class LidlPlaywrightScraper:
             new_count = 0
             for p in products:
                 name = p.get('name', '').strip()
-                if name and len(name) > 3 and name not in self.seen_names:
-                    self.seen_names.add(name)
+                if len(name) <= 3:
+                    continue
+                key = _canon(name)
+                if key and key not in self.seen_names:
+                    self.seen_names.add(key)
                     p['price_bgn'] = p.get('price')
                     self.products.append(p)
+                    self.stream_product(p)
                     new_count += 1
+            if self._out is not None:
+                self._out.flush()
             
             self.stats['pages_visited'] += 1
             if new_count > 0:
@@ -264,6 +342,9 @@ class LidlPlaywrightScraper:
             logger.error(f"Error: {e}")
             self.stats['errors'] += 1
             return 0
+        finally:
+            if page is not None:
+                await page.close()
     
     async def run(self):
         """Main entry point"""
@@ -273,6 +354,19 @@ class LidlPlaywrightScraper:
         logger.info("Lidl Playwright Scraper - Starting")
         logger.info("=" * 60)
         
+        self.stream_file.parent.mkdir(parents=True, exist_ok=True)
+        self._out = open(self.stream_file, 'wb')  # this run's products only, like output_file
+        try:
+            await self._crawl()
+        finally:
+            self._out.close()
+            self._out = None
+        
+        self.save_products()
+        self.print_summary()
+    
+    async def _crawl(self):
+        """Discover category URLs and scrape them in paced batches"""
         async with async_playwright() as p:
             browser = await p.chromium.launch(
                 headless=self.headless,
@@ -283,40 +377,54 @@ class LidlPlaywrightScraper:
                 ]
             )
             
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-                locale='bg-BG',
-            )
-            
+            # One context for the whole crawl: cookies and consent carry over between
+            # pages, and each URL only pays for a new tab
+            context = await self.new_context(browser)
             page = await context.new_page()
-            await apply_stealth(page)
             
             # Get URLs to scrape
             urls = await self.get_category_urls(page)
+            await page.close()
+            
+            urls = urls[:MAX_URLS]
+            sem = asyncio.Semaphore(MAX_CONCURRENCY)
             
-            # Scrape each URL
-            for i, url in enumerate(urls[:40]):  # Limit to 40 URLs
-                logger.info(f"Progress: {i+1}/{min(len(urls), 40)}")
-                await self.scrape_url(page, url)
+            async def worker(i, url):
+                async with sem:
+                    logger.info(f"Progress: {i+1}/{len(urls)}")
+                    await self.scrape_url(context, url)
+            
+            # Scrape MAX_CONCURRENCY URLs at a time, with a coffee break every COFFEE_EVERY pages
+            for start in range(0, len(urls), COFFEE_EVERY):
+                batch = urls[start:start + COFFEE_EVERY]
+                await asyncio.gather(*[worker(start + j, url) for j, url in enumerate(batch)])
                 
-                # Coffee break every 15 pages
-                if (i + 1) % 15 == 0 and i < len(urls) - 1:
+                if start + COFFEE_EVERY < len(urls):
                     coffee = random.randint(45, 90)
                     logger.info(f"☕ Coffee break: {coffee}s...")
                     await asyncio.sleep(coffee)
             
+            await context.close()
             await browser.close()
-        
-        self.save_products()
-        self.print_summary()
+    
+    def stream_product(self, product: dict):
+        """Append one product to the NDJSON stream"""
+        if self._out is None:
+            return
+        if orjson is not None:
+            self._out.write(orjson.dumps(product) + b'\n')
+        else:
+            self._out.write(json.dumps(product, ensure_ascii=False).encode('utf-8') + b'\n')
     
     def save_products(self):
-        """Save to JSON"""
+        """Save the full JSON array (the NDJSON stream already has every product)"""
         self.output_file.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.products, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            self.output_file.write_bytes(orjson.dumps(self.products, option=orjson.OPT_INDENT_2))
+        else:
+            with open(self.output_file, 'w', encoding='utf-8') as f:
+                json.dump(self.products, f, ensure_ascii=False, indent=2)
         
         logger.info(f"💾 Saved {len(self.products)} products to {self.output_file}")
     
@@ -21,8 +21,10 @@ Usage:
     scraper.save_to_db()
 """
 
+import asyncio
 import json
 import fcntl
+import hashlib
 import logging
 import re
 import sqlite3
@@ -34,6 +36,17 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
 
 import requests
+from lxml import etree, html as lxml_html
+
+try:
+    import aiohttp
+except ImportError:  # optional, product pages are fetched one at a time otherwise
+    aiohttp = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
 
 # Infrastructure imports
 import sys
@@ -49,8 +62,44 @@ logger = logging.getLogger(__name__)
 DOMAIN = "www.lidl.bg"
 LIDL_STORE_ID = 2
 
+# The page is parsed once with lxml; these pull the few nodes each extractor needs
+_HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8', recover=True, collect_ids=False)
+_XP_JSON_LD = etree.XPath("//script[@type='application/ld+json']/text()", smart_strings=False)
+_XP_PRICE_VALUE = etree.XPath("//*[contains(@class, 'ods-price__value')]")
+_XP_STRIKE = etree.XPath("//*[contains(@class, 'ods-price--strikethrough')]")
+_XP_SIZE_TEXT = etree.XPath("//text()[contains(., 'опаковка')]", smart_strings=False)
+_XP_TEXT = etree.XPath("//text()", smart_strings=False)
+
+# Patterns, compiled once at import; prices are matched against a node's own text, not the page
+_BGN_PRICE_RE = re.compile(r'\s*(\d+[,\.]\d{2})\s*(?:лв|ЛВ)', re.IGNORECASE)
+_EUR_RE = re.compile(r'\s*(\d+[,\.]\d{2})€')
+_SIZE_UNIT_RE = re.compile(r'(\d+(?:[,\.]\d+)?)\s*(g|kg|ml|l|л)\s*/\s*опаковка', re.IGNORECASE)
+_SIZE_PCS_RE = re.compile(r'(\d+(?:[,\.]\d+)?)\s*(бр)\.?\s*/\s*опаковка', re.IGNORECASE)
+_SIZE_PATTERNS = ((_SIZE_UNIT_RE, None), (_SIZE_PCS_RE, 'бр'))  # (pattern, forced unit)
+_SCHEDULED_RE = re.compile(r'в магазините от (\d{2}\.\d{2}\.?\s*-\s*\d{2}\.\d{2}\.?)')
+_FROM_DATE_RE = re.compile(r'от\s+(\d{2}\.\d{2}\.)')
+# Matched against lowercased text: a case-sensitive literal lets re skip ahead with a fast
+# substring scan, where re.IGNORECASE has to test every character
+_IN_STORE_RE = re.compile(r'наличн[оа]\s+в\s+магазин')
+_SOLD_OUT_RE = re.compile(r'изчерпан[оа]')
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+\d+-(\d+)/(\d+|\*)')
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    """UTF-8 JSON for the checkpoint and scrape_cache."""
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False).encode('utf-8')
+
+
+# _parse_product's answer when a ranged (prefix-only) page lacks the JSON-LD or BGN price
+_INCOMPLETE = object()
 
-@dataclass
+# Per-instance __dict__ dropped where the interpreter allows it (slots=True is 3.10+)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class LidlProductData:
     """
     Product data extracted from Lidl product page.
@@ -114,10 +163,22 @@ class LidlProductScraper:
     - Availability text like "в магазините от X - Y" is in HTML
     """
     
+    # Product pages in flight at once (aiohttp only); the domain rate limit still applies
+    MAX_CONCURRENCY = 8
+    BATCH_SIZE = 10  # URLs gathered per async batch
+    # JSON-LD, price and keyfacts sit near the top of the page; the rest is footer,
+    # recommendations and scripts. Ask for this prefix and fall back to the full page
+    PREFIX_BYTES = 128 * 1024
+    
     def __init__(self, db_path: Optional[Path] = None):
         self.db_path = db_path or Path(__file__).parent.parent.parent.parent / "data" / "promobg.db"
         self.products: List[LidlProductData] = []
-        self.checkpoint_file = self.db_path.parent / "lidl_checkpoint.json"
+        # JSON Lines, one {"url", "product"} record appended per processed URL
+        self.checkpoint_file = self.db_path.parent / "lidl_checkpoint.jsonl"
+        self._checkpoint_fh = None  # open (and locked) while scrape_products runs
+        self._cache_conn = None  # scrape_cache connection, open while scrape_products runs
+        self.cache_hits = 0  # pages answered from scrape_cache (304 or an unchanged body)
+        self.range_fallbacks = 0  # prefix fetches that needed the full page after all
         
         # Infrastructure setup
         self.session_manager = SessionManager(config=SessionConfig(
@@ -135,77 +196,57 @@ class LidlProductScraper:
             exponential_base=2.0
         ))
     
-    def _extract_json_ld(self, html: str) -> Optional[Dict[str, Any]]:
+    def _extract_json_ld(self, tree) -> Optional[Dict[str, Any]]:
         """Extract Product schema.org JSON-LD from page."""
-        pattern = r'<script type="application/ld\+json">(\{"@context":"http://schema\.org","@type":"Product"[^<]+)</script>'
-        match = re.search(pattern, html)
-        if not match:
-            return None
-        
-        try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError as e:
-            logger.warning(f"Failed to parse JSON-LD: {e}")
-            return None
+        for text in _XP_JSON_LD(tree):
+            if '"Product"' not in text:
+                continue
+            try:
+                data = orjson.loads(text) if orjson is not None else json.loads(text)
+            except json.JSONDecodeError as e:  # orjson's error subclasses it
+                logger.warning(f"Failed to parse JSON-LD: {e}")
+                continue
+            if isinstance(data, dict) and data.get('@type') == 'Product':
+                return data
+        return None
+    
+    @staticmethod
+    def _first_price(nodes, pattern: re.Pattern) -> Optional[float]:
+        """Price from the first node whose own text matches pattern"""
+        for node in nodes:
+            match = pattern.match(node.text or '')
+            if match:
+                try:
+                    return float(match.group(1).replace(',', '.'))
+                except ValueError:
+                    pass
+        return None
     
-    def _extract_bgn_price(self, html: str) -> tuple[Optional[float], Optional[float]]:
+    def _extract_bgn_price(self, tree) -> tuple[Optional[float], Optional[float]]:
         """
         Extract BGN price from rendered HTML.
         
         JSON-LD price is EUR even when priceCurrency says BGN!
         Must get real BGN from HTML: <div class="ods-price__value">9.00ЛВ.*</div>
         """
-        # Current BGN price
-        current_match = re.search(
-            r'ods-price__value[^>]*>(\d+[,\.]\d{2})\s*(?:лв|ЛВ)',
-            html,
-            re.IGNORECASE
-        )
-        current_price = None
-        if current_match:
-            try:
-                current_price = float(current_match.group(1).replace(',', '.'))
-            except ValueError:
-                pass
-        
-        # Old/crossed-out price
-        old_match = re.search(
-            r'ods-price--strikethrough[^>]*>(\d+[,\.]\d{2})\s*(?:лв|ЛВ)',
-            html,
-            re.IGNORECASE
-        )
-        old_price = None
-        if old_match:
-            try:
-                old_price = float(old_match.group(1).replace(',', '.'))
-            except ValueError:
-                pass
-        
+        # Current BGN price, then the old/crossed-out one
+        current_price = self._first_price(_XP_PRICE_VALUE(tree), _BGN_PRICE_RE)
+        old_price = self._first_price(_XP_STRIKE(tree), _BGN_PRICE_RE)
         return current_price, old_price
     
-    def _extract_eur_price(self, html: str) -> Optional[float]:
+    def _extract_eur_price(self, tree) -> Optional[float]:
         """Extract EUR price from HTML for reference."""
-        match = re.search(r'ods-price__value[^>]*>(\d+[,\.]\d{2})€', html)
-        if match:
-            try:
-                return float(match.group(1).replace(',', '.'))
-            except ValueError:
-                pass
-        return None
+        return self._first_price(_XP_PRICE_VALUE(tree), _EUR_RE)
     
-    def _extract_size(self, html: str) -> tuple[Optional[str], Optional[float], Optional[str]]:
+    def _extract_size(self, tree) -> tuple[Optional[str], Optional[float], Optional[str]]:
         """
         Extract size/weight from keyfacts HTML.
         
         Patterns: "600 g/опаковка", "1.5 l/опаковка", "1 kg/опаковка"
         """
-        patterns = [
-            (r'(\d+(?:[,\.]\d+)?)\s*(g|kg|ml|l|л)\s*/\s*опаковка', None),
-            (r'(\d+(?:[,\.]\d+)?)\s*(бр)\.?\s*/\s*опаковка', 'бр'),
-        ]
-        
-        for pattern, force_unit in patterns:
-            match = re.search(pattern, html, re.IGNORECASE)
+        texts = _XP_SIZE_TEXT(tree)  # only the few text nodes that mention "опаковка"
+        for pattern, force_unit in _SIZE_PATTERNS:
+            match = next((m for m in map(pattern.search, texts) if m), None)
             if match:
                 try:
                     value = float(match.group(1).replace(',', '.'))
@@ -219,7 +260,7 @@ class LidlProductScraper:
         
         return None, None, None
     
-    def _extract_availability_detailed(self, html: str) -> tuple[Optional[str], Optional[str]]:
+    def _extract_availability_detailed(self, text: str) -> tuple[Optional[str], Optional[str]]:
         """
         Extract detailed availability from HTML.
         
@@ -231,24 +272,22 @@ class LidlProductScraper:
         Returns: (availability_text, availability_type)
         """
         # Look for scheduled availability (future date range)
-        scheduled = re.search(
-            r'в магазините от (\d{2}\.\d{2}\.?\s*-\s*\d{2}\.\d{2}\.?)',
-            html
-        )
+        scheduled = _SCHEDULED_RE.search(text)
         if scheduled:
             return f"в магазините от {scheduled.group(1)}", "SCHEDULED"
         
         # Look for "available from" single date
-        from_date = re.search(r'от\s+(\d{2}\.\d{2}\.)', html)
+        from_date = _FROM_DATE_RE.search(text)
         if from_date:
             return f"от {from_date.group(1)}", "UPCOMING"
         
         # Check for in-store availability
-        if re.search(r'наличн[оа]\s+в\s+магазин', html, re.IGNORECASE):
+        lowered = text.lower()
+        if _IN_STORE_RE.search(lowered):
             return "Налично в магазина", "IN_STORE"
         
         # Check for sold out
-        if re.search(r'изчерпан[оа]', html, re.IGNORECASE):
+        if _SOLD_OUT_RE.search(lowered):
             return "Изчерпано", "SOLD_OUT"
         
         return None, None
@@ -273,17 +312,40 @@ class LidlProductScraper:
         """Clean HTML from description."""
         if not desc:
             return None
-        clean = re.sub(r'<[^>]+>', ' ', desc)
+        clean = _HTML_TAG_RE.sub(' ', desc)
         clean = ' '.join(clean.split())
         return clean.strip() if clean else None
     
-    def _fetch_with_retry(self, url: str) -> Optional[requests.Response]:
+    def _request_headers(self, cached: Optional[tuple]) -> Dict[str, str]:
+        """Range for the page prefix, plus validators when the page is in scrape_cache."""
+        headers = {'Range': f"bytes=0-{self.PREFIX_BYTES - 1}"}
+        if cached:
+            etag, last_modified = cached[0], cached[1]
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+    
+    @staticmethod
+    def _is_prefix(status: int, content_range: Optional[str]) -> bool:
+        """True when a ranged response holds only the start of the page."""
+        if status != 206:
+            return False  # server ignored Range and sent everything
+        match = _CONTENT_RANGE_RE.match(content_range or '')
+        if not match or match.group(2) == '*':
+            return True
+        return int(match.group(1)) + 1 < int(match.group(2))
+    
+    def _fetch_with_retry(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
         """Fetch URL with retry logic and circuit breaker."""
         def _do_fetch():
             if self.circuit_breaker.is_open:
                 raise Exception("Circuit breaker is open")
             session = self.session_manager.get_session(DOMAIN)
-            response = session.get(url, timeout=30)
+            response = session.get(url, timeout=30, headers=headers)
+            if response.status_code >= 400:
+                self.session_manager.report_error(DOMAIN, response.status_code)
             response.raise_for_status()
             return response
         
@@ -293,6 +355,71 @@ class LidlProductScraper:
             logger.error(f"All retries failed for {url}: {e}")
             return None
     
+    def _parse_product(self, url: str, content: bytes, partial: bool = False):
+        """
+        Parse a fetched product page (shared by the sync and async fetch paths).
+        
+        With partial=True content is only the start of the page (the recovering
+        parser closes whatever was cut off); _INCOMPLETE is returned if the
+        JSON-LD or BGN price did not make it into that prefix.
+        """
+        if not content:
+            if partial:
+                return _INCOMPLETE
+            logger.warning(f"Empty page for {url}")
+            return None
+        tree = lxml_html.document_fromstring(content, parser=_HTML_PARSER)
+        
+        # Extract JSON-LD
+        json_ld = self._extract_json_ld(tree)
+        if not json_ld and partial:
+            return _INCOMPLETE
+        if not json_ld:
+            logger.warning(f"No JSON-LD found for {url}")
+            return None
+        
+        # Validate SKU exists
+        sku = json_ld.get('sku')
+        if not sku:
+            logger.warning(f"Missing SKU for {url}")
+            return None
+        
+        # Extract prices from HTML (NOT from JSON-LD!)
+        price_bgn, old_price_bgn = self._extract_bgn_price(tree)
+        if price_bgn is None and partial:
+            return _INCOMPLETE
+        price_eur = self._extract_eur_price(tree)
+        
+        # Extract size from HTML
+        size_raw, size_value, size_unit = self._extract_size(tree)
+        
+        # Extract detailed availability from the page text
+        avail_text, avail_type = self._extract_availability_detailed('\n'.join(_XP_TEXT(tree)))
+        if not avail_text:
+            avail_text = self._extract_availability_jsonld(json_ld)
+        
+        # Build product data
+        product = LidlProductData(
+            sku=sku,
+            product_url=url,
+            name=json_ld.get('name', ''),
+            description=self._clean_description(json_ld.get('description')),
+            image_url=json_ld.get('image', [None])[0] if isinstance(json_ld.get('image'), list) else json_ld.get('image'),
+            brand=json_ld.get('brand', {}).get('name') if isinstance(json_ld.get('brand'), dict) else None,
+            price_bgn=price_bgn,
+            old_price_bgn=old_price_bgn,
+            price_eur=price_eur,
+            size_raw=size_raw,
+            size_value=size_value,
+            size_unit=size_unit,
+            availability=avail_text,
+            availability_type=avail_type,
+        )
+        
+        self.circuit_breaker.record_success()
+        logger.info(f"Scraped: {product.name} - {price_bgn} лв - {size_raw} - {avail_text}")
+        return product
+    
     def fetch_product(self, url: str) -> Optional[LidlProductData]:
         """
         Fetch and parse a single product page.
@@ -307,57 +434,27 @@ class LidlProductScraper:
         time.sleep(random.uniform(1.0, 3.0))
         
         try:
-            response = self._fetch_with_retry(url)
+            cached = self._cache_get(url)
+            response = self._fetch_with_retry(url, self._request_headers(cached))
+            if response is not None and self._is_prefix(response.status_code, response.headers.get('Content-Range')):
+                if self._cache_hit(cached, response.status_code, response.content):
+                    return self._cached_product(cached)
+                product = self._parse_product(url, response.content, partial=True)
+                if product is not _INCOMPLETE:
+                    self._cache_put(url, response.headers, response.content, product)
+                    return product
+                self.range_fallbacks += 1
+                self.rate_limiter.wait(url)
+                response = self._fetch_with_retry(url)
+            
             if not response:
                 self.circuit_breaker.record_failure()
                 return None
             
-            html = response.text
-            
-            # Extract JSON-LD
-            json_ld = self._extract_json_ld(html)
-            if not json_ld:
-                logger.warning(f"No JSON-LD found for {url}")
-                return None
-            
-            # Validate SKU exists
-            sku = json_ld.get('sku')
-            if not sku:
-                logger.warning(f"Missing SKU for {url}")
-                return None
-            
-            # Extract prices from HTML (NOT from JSON-LD!)
-            price_bgn, old_price_bgn = self._extract_bgn_price(html)
-            price_eur = self._extract_eur_price(html)
-            
-            # Extract size from HTML
-            size_raw, size_value, size_unit = self._extract_size(html)
-            
-            # Extract detailed availability from HTML
-            avail_text, avail_type = self._extract_availability_detailed(html)
-            if not avail_text:
-                avail_text = self._extract_availability_jsonld(json_ld)
-            
-            # Build product data
-            product = LidlProductData(
-                sku=sku,
-                product_url=url,
-                name=json_ld.get('name', ''),
-                description=self._clean_description(json_ld.get('description')),
-                image_url=json_ld.get('image', [None])[0] if isinstance(json_ld.get('image'), list) else json_ld.get('image'),
-                brand=json_ld.get('brand', {}).get('name') if isinstance(json_ld.get('brand'), dict) else None,
-                price_bgn=price_bgn,
-                old_price_bgn=old_price_bgn,
-                price_eur=price_eur,
-                size_raw=size_raw,
-                size_value=size_value,
-                size_unit=size_unit,
-                availability=avail_text,
-                availability_type=avail_type,
-            )
-            
-            self.circuit_breaker.record_success()
-            logger.info(f"Scraped: {product.name} - {price_bgn} лв - {size_raw} - {avail_text}")
+            if self._cache_hit(cached, response.status_code, response.content):
+                return self._cached_product(cached)
+            product = self._parse_product(url, response.content)
+            self._cache_put(url, response.headers, response.content, product)
             return product
             
         except requests.RequestException as e:
@@ -369,31 +466,246 @@ class LidlProductScraper:
             self.circuit_breaker.record_failure()
             return None
     
-    def _save_checkpoint(self, processed_urls: List[str]):
-        """Save checkpoint - OVERWRITES existing file."""
-        checkpoint_data = {
-            'processed_urls': processed_urls,
-            'products': [p.to_dict() for p in self.products],
-            'timestamp': datetime.now(timezone.utc).isoformat()
-        }
-        with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-            json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Checkpoint saved: {len(processed_urls)} processed")
+    async def _afetch_with_retry(self, http: "aiohttp.ClientSession", url: str,
+                                 headers: Optional[Dict[str, str]] = None) -> Optional[tuple]:
+        """
+        Async _fetch_with_retry: (status, headers, body), or None once retries
+        are exhausted.
+        """
+        async def _do_fetch():
+            if self.circuit_breaker.is_open:
+                raise Exception("Circuit breaker is open")
+            # Same rotating identity as the sync path: the session's headers and cookies,
+            # and the request counts towards its rotation. aiohttp negotiates its own encoding
+            session = self.session_manager.get_session(DOMAIN)
+            session.count_request()
+            request_headers = {k: v for k, v in session.session.headers.items() if k != 'Accept-Encoding'}
+            if headers:
+                request_headers.update(headers)
+            cookies = session.session.cookies.get_dict()
+            
+            async with http.get(url, headers=request_headers, cookies=cookies) as response:
+                session.session.cookies.update({k: m.value for k, m in response.cookies.items()})
+                if response.status >= 400:
+                    self.session_manager.report_error(DOMAIN, response.status)
+                response.raise_for_status()
+                return response.status, response.headers, await response.read()
+        
+        try:
+            return await self.retry_handler.execute_async(_do_fetch)
+        except Exception as e:
+            logger.error(f"All retries failed for {url}: {e}")
+            return None
+    
+    async def fetch_product_async(self, http: "aiohttp.ClientSession", url: str) -> Optional[LidlProductData]:
+        """
+        fetch_product for the async crawl: waits for its rate-limit slot without
+        blocking the other requests in flight.
+        """
+        await asyncio.sleep(self.rate_limiter.reserve(url) + random.uniform(1.0, 3.0))
+        
+        try:
+            cached = self._cache_get(url)
+            fetched = await self._afetch_with_retry(http, url, self._request_headers(cached))
+            # lxml drops the GIL while parsing, so this overlaps with other downloads
+            if fetched is not None and self._is_prefix(fetched[0], fetched[1].get('Content-Range')):
+                status, headers, content = fetched
+                if self._cache_hit(cached, status, content):
+                    return self._cached_product(cached)
+                product = await asyncio.to_thread(self._parse_product, url, content, True)
+                if product is not _INCOMPLETE:
+                    self._cache_put(url, headers, content, product)
+                    return product
+                self.range_fallbacks += 1
+                await asyncio.sleep(self.rate_limiter.reserve(url))
+                fetched = await self._afetch_with_retry(http, url)
+            
+            if fetched is None:
+                self.circuit_breaker.record_failure()
+                return None
+            
+            status, headers, content = fetched
+            if self._cache_hit(cached, status, content):
+                return self._cached_product(cached)
+            product = await asyncio.to_thread(self._parse_product, url, content)
+            self._cache_put(url, headers, content, product)
+            return product
+            
+        except Exception as e:
+            logger.exception(f"Error parsing {url}")
+            self.circuit_breaker.record_failure()
+            return None
+    
+    def _scrape_products_serial(self, remaining: List[str], processed_urls: List[str], total: int):
+        """Fetch remaining URLs one at a time (no aiohttp)."""
+        for i, url in enumerate(remaining, len(processed_urls) + 1):
+            if self.circuit_breaker.is_open:
+                logger.error("Circuit breaker open - stopping scrape")
+                break
+            
+            product = self.fetch_product(url)
+            if product:
+                self.products.append(product)
+            
+            processed_urls.append(url)
+            self._checkpoint(url, product)
+            
+            if i % 10 == 0:
+                logger.info(f"Progress: {i}/{total} ({len(self.products)} successful)")
+            
+            if i % 50 == 0:
+                pause = random.uniform(30, 60)
+                logger.info(f"Coffee break: {pause:.0f}s")
+                time.sleep(pause)
+    
+    async def _scrape_products_async(self, remaining: List[str], processed_urls: List[str], total: int):
+        """
+        Fetch remaining URLs MAX_CONCURRENCY at a time, in batches so that
+        products, checkpoint lines and coffee breaks keep the serial loop's order.
+        """
+        sem = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        skipped = object()  # the circuit breaker opened before this URL was tried
+        
+        async def bounded(http, url):
+            async with sem:
+                if self.circuit_breaker.is_open:
+                    return skipped
+                return await self.fetch_product_async(http, url)
+        
+        timeout = aiohttp.ClientTimeout(total=30)
+        # At 10 requests/minute a connection can sit idle longer than aiohttp's default
+        # 15s keep-alive; hold it for a minute so TCP+TLS is paid once, not per page
+        connector = aiohttp.TCPConnector(limit_per_host=self.MAX_CONCURRENCY, keepalive_timeout=60)
+        batch_size = self.BATCH_SIZE
+        
+        # Cookies live in the BrowserSession (persisted across rotations), not in aiohttp's jar
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector,
+                                         cookie_jar=aiohttp.DummyCookieJar()) as http:
+            for start in range(0, len(remaining), batch_size):
+                if self.circuit_breaker.is_open:
+                    logger.error("Circuit breaker open - stopping scrape")
+                    break
+                
+                batch = remaining[start:start + batch_size]
+                results = await asyncio.gather(*[bounded(http, url) for url in batch])
+                
+                before = len(processed_urls)
+                for url, product in zip(batch, results):
+                    if product is skipped:
+                        continue
+                    if product:
+                        self.products.append(product)
+                    processed_urls.append(url)
+                    self._checkpoint(url, product)
+                done = len(processed_urls)
+                
+                if done // 10 > before // 10:
+                    logger.info(f"Progress: {done}/{total} ({len(self.products)} successful)")
+                
+                if done // 50 > before // 50 and start + batch_size < len(remaining):
+                    pause = random.uniform(30, 60)
+                    logger.info(f"Coffee break: {pause:.0f}s")
+                    await asyncio.sleep(pause)
+    
+    def _open_checkpoint(self):
+        """Open the checkpoint for appending, locked against a parallel run."""
+        self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+        fh = open(self.checkpoint_file, 'a+b')
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            fh.close()
+            raise RuntimeError(f"{self.checkpoint_file} is in use by another scrape")
+        
+        # A crash can leave half a line; start the next record on a fresh one
+        if fh.tell():
+            fh.seek(fh.tell() - 1)
+            if fh.read(1) != b'\n':
+                fh.write(b'\n')
+        self._checkpoint_fh = fh
+    
+    def _checkpoint(self, url: str, product: Optional[LidlProductData]):
+        """Append one processed URL (and its product, if any) to the checkpoint."""
+        if self._checkpoint_fh is None:
+            return
+        record = {'url': url, 'product': product.to_dict() if product else None}
+        self._checkpoint_fh.write(_dumps(record) + b'\n')
+        self._checkpoint_fh.flush()
     
     def _load_checkpoint(self) -> tuple[List[str], List[LidlProductData]]:
         """Load checkpoint if exists."""
         if not self.checkpoint_file.exists():
             return [], []
         
+        processed_urls = []
+        products = []
         try:
-            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            products = [LidlProductData(**p) for p in data.get('products', [])]
-            return data.get('processed_urls', []), products
+            loads = orjson.loads if orjson is not None else json.loads
+            with open(self.checkpoint_file, 'rb') as f:
+                for line in f:
+                    try:
+                        record = loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a line cut short by a crash
+                    processed_urls.append(record['url'])
+                    if record['product']:
+                        products.append(LidlProductData(**record['product']))
         except Exception as e:
             logger.warning(f"Failed to load checkpoint: {e}")
             return [], []
+        return processed_urls, products
+    
+    def _open_cache(self):
+        """Open scrape_cache: per URL, the validators and body hash behind its last parse."""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_sha1 BLOB,
+                product BLOB,
+                scraped_at TEXT
+            )
+        """)
+        self._cache_conn = conn
+    
+    def _cache_get(self, url: str) -> Optional[tuple]:
+        """(etag, last_modified, body_sha1, product JSON) for url, if cached."""
+        if self._cache_conn is None:
+            return None
+        return self._cache_conn.execute("""
+            SELECT etag, last_modified, body_sha1, product FROM scrape_cache WHERE url = ?
+        """, (url,)).fetchone()
+    
+    @staticmethod
+    def _cache_hit(cached: Optional[tuple], status: int, content: bytes) -> bool:
+        """304, or byte-for-byte the body the cached product was parsed from."""
+        if not cached:
+            return False
+        return status == 304 or hashlib.sha1(content).digest() == cached[2]
+    
+    def _cached_product(self, cached: tuple) -> LidlProductData:
+        """The product parsed from an unchanged page on an earlier run."""
+        data = orjson.loads(cached[3]) if orjson is not None else json.loads(cached[3])
+        del data['scraped_at']  # confirmed current just now
+        self.cache_hits += 1
+        self.circuit_breaker.record_success()
+        return LidlProductData(**data)
+    
+    def _cache_put(self, url: str, headers, content: bytes, product: Optional[LidlProductData]):
+        """Remember the validators and body hash behind product (or forget url if it failed)."""
+        if self._cache_conn is None:
+            return
+        if product is None:
+            self._cache_conn.execute("DELETE FROM scrape_cache WHERE url = ?", (url,))
+            return
+        self._cache_conn.execute("""
+            INSERT OR REPLACE INTO scrape_cache
+                (url, etag, last_modified, body_sha1, product, scraped_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (url, headers.get('ETag'), headers.get('Last-Modified'),
+              hashlib.sha1(content).digest(), _dumps(product.to_dict()), product.scraped_at))
     
     def _delete_checkpoint(self):
         """Delete checkpoint file on successful completion."""
@@ -401,7 +713,7 @@ class LidlProductScraper:
             self.checkpoint_file.unlink()
             logger.info("Checkpoint file deleted")
     
-    def scrape_products(self, urls: List[str], checkpoint_every: int = 10) -> List[LidlProductData]:
+    def scrape_products(self, urls: List[str]) -> List[LidlProductData]:
         """Scrape multiple product pages with checkpoint support."""
         # Load checkpoint
         processed_urls, self.products = self._load_checkpoint()
@@ -409,34 +721,30 @@ class LidlProductScraper:
             logger.info(f"Resuming from checkpoint: {len(processed_urls)} already processed")
         
         # Filter already processed
-        remaining = [u for u in urls if u not in processed_urls]
+        done = set(processed_urls)
+        remaining = [u for u in urls if u not in done]
         total = len(urls)
         
         logger.info(f"Starting scrape: {len(remaining)} remaining of {total} total")
         
-        for i, url in enumerate(remaining, len(processed_urls) + 1):
-            if self.circuit_breaker.is_open:
-                logger.error("Circuit breaker open - stopping scrape")
-                break
-            
-            product = self.fetch_product(url)
-            if product:
-                self.products.append(product)
-            
-            processed_urls.append(url)
-            
-            if i % 10 == 0:
-                logger.info(f"Progress: {i}/{total} ({len(self.products)} successful)")
-            
-            if checkpoint_every and i % checkpoint_every == 0:
-                self._save_checkpoint(processed_urls)
-            
-            if i % 50 == 0:
-                pause = random.uniform(30, 60)
-                logger.info(f"Coffee break: {pause:.0f}s")
-                time.sleep(pause)
+        self._open_checkpoint()
+        self._open_cache()
+        try:
+            if aiohttp is not None:
+                asyncio.run(self._scrape_products_async(remaining, processed_urls, total))
+            else:
+                self._scrape_products_serial(remaining, processed_urls, total)
+        finally:
+            self._checkpoint_fh.close()
+            self._checkpoint_fh = None
+            self._cache_conn.close()
+            self._cache_conn = None
         
-        logger.info(f"Scrape complete: {len(self.products)}/{total} products")
+        logger.info(f"Scrape complete: {len(self.products)}/{total} products "
+                    f"({self.cache_hits} unchanged since the last run)")
+        if self.range_fallbacks:
+            # Climbing steadily means the page layout moved data past PREFIX_BYTES
+            logger.info(f"Prefix fetches that needed the full page: {self.range_fallbacks}")
         return self.products
     
     def _validate_price(self, price: float) -> bool:
@@ -455,7 +763,28 @@ class LidlProductScraper:
         try:
             cursor = conn.cursor()
             cursor.execute("PRAGMA foreign_keys = ON")
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
             cursor.execute("BEGIN TRANSACTION")
+            
+            # Two lookups for every Lidl row instead of two SELECTs per product:
+            # SKU -> (store_product_id, product_id), and each store product's latest price row
+            cursor.execute("""
+                SELECT store_product_code, id, product_id FROM store_products
+                WHERE store_id = ?
+            """, (LIDL_STORE_ID,))
+            existing = {code: (sp_id, product_id) for code, sp_id, product_id in cursor.fetchall()}
+            cursor.execute("""
+                SELECT p.store_product_id, p.id FROM prices p
+                JOIN store_products sp ON sp.id = p.store_product_id
+                WHERE sp.store_id = ?
+                ORDER BY p.created_at, p.id
+            """, (LIDL_STORE_ID,))
+            latest_price = dict(cursor.fetchall())  # later rows win, so this keeps the newest
+            
+            store_product_updates = []
+            product_updates = []
+            price_updates = []
             updated = 0
             inserted = 0
             skipped = 0
@@ -467,78 +796,32 @@ class LidlProductScraper:
                     skipped += 1
                     continue
                 
-                # Find existing store_product by SKU
-                cursor.execute("""
-                    SELECT sp.id, sp.product_id FROM store_products sp
-                    WHERE sp.store_id = ? AND sp.store_product_code = ?
-                """, (LIDL_STORE_ID, product.sku))
+                discount_pct = None
+                if product.price_bgn and product.old_price_bgn and product.old_price_bgn > product.price_bgn:
+                    discount_pct = round((1 - product.price_bgn / product.old_price_bgn) * 100, 1)
                 
-                row = cursor.fetchone()
+                row = existing.get(product.sku)
                 
                 if row:
                     store_product_id, product_id = row
-                    
-                    # Update store_product
-                    cursor.execute("""
-                        UPDATE store_products SET
-                            store_product_url = COALESCE(?, store_product_url),
-                            store_image_url = COALESCE(?, store_image_url),
-                            package_size = COALESCE(?, package_size),
-                            last_seen_at = ?,
-                            scraped_at = ?,
-                            updated_at = ?
-                        WHERE id = ?
-                    """, (product.product_url, product.image_url, product.size_raw,
-                          now, now, now, store_product_id))
-                    
-                    # Update product
-                    cursor.execute("""
-                        UPDATE products SET
-                            brand = COALESCE(?, brand),
-                            quantity = COALESCE(?, quantity),
-                            unit = COALESCE(?, unit),
-                            description = COALESCE(?, description),
-                            updated_at = ?
-                        WHERE id = ?
-                    """, (product.brand, product.size_value, product.size_unit,
-                          product.description, now, product_id))
+                    store_product_updates.append((product.product_url, product.image_url, product.size_raw,
+                                                  now, now, now, store_product_id))
+                    product_updates.append((product.brand, product.size_value, product.size_unit,
+                                            product.description, now, product_id))
                     
                     # Update or insert price
                     if product.price_bgn:
-                        cursor.execute("""
-                            SELECT id FROM prices 
-                            WHERE store_product_id = ? 
-                            ORDER BY created_at DESC LIMIT 1
-                        """, (store_product_id,))
-                        
-                        price_row = cursor.fetchone()
-                        discount_pct = None
-                        if product.old_price_bgn and product.old_price_bgn > product.price_bgn:
-                            discount_pct = round((1 - product.price_bgn / product.old_price_bgn) * 100, 1)
-                        
-                        if price_row:
-                            cursor.execute("""
-                                UPDATE prices SET
-                                    current_price = ?,
-                                    old_price = ?,
-                                    discount_percent = ?,
-                                    currency = 'BGN',
-                                    updated_at = ?
-                                WHERE id = ?
-                            """, (product.price_bgn, product.old_price_bgn, discount_pct,
-                                  now, price_row[0]))
+                        price_id = latest_price.get(store_product_id)
+                        if price_id:
+                            price_updates.append((product.price_bgn, product.old_price_bgn, discount_pct,
+                                                  now, price_id))
                         else:
-                            cursor.execute("""
-                                INSERT INTO prices (
-                                    store_product_id, current_price, old_price, discount_percent,
-                                    currency, valid_from, created_at, updated_at
-                                ) VALUES (?, ?, ?, ?, 'BGN', ?, ?, ?)
-                            """, (store_product_id, product.price_bgn, product.old_price_bgn,
-                                  discount_pct, now, now, now))
+                            latest_price[store_product_id] = self._insert_price(
+                                cursor, store_product_id, product, discount_pct, now)
                     
                     updated += 1
                 else:
-                    # Insert new product
+                    # Insert new product (one at a time: its ids link the rows below)
                     cursor.execute("""
                         INSERT INTO products (name, normalized_name, brand, quantity, unit, 
                                             description, created_at, updated_at)
@@ -559,23 +842,46 @@ class LidlProductScraper:
                           product.image_url, product.size_raw, now, now, now, now, now))
                     
                     store_product_id = cursor.lastrowid
+                    # A repeat of this SKU later in the batch updates these rows
+                    existing[product.sku] = (store_product_id, product_id)
                     
                     # Insert price
                     if product.price_bgn:
-                        discount_pct = None
-                        if product.old_price_bgn and product.old_price_bgn > product.price_bgn:
-                            discount_pct = round((1 - product.price_bgn / product.old_price_bgn) * 100, 1)
-                        
-                        cursor.execute("""
-                            INSERT INTO prices (
-                                store_product_id, current_price, old_price, discount_percent,
-                                currency, valid_from, created_at, updated_at
-                            ) VALUES (?, ?, ?, ?, 'BGN', ?, ?, ?)
-                        """, (store_product_id, product.price_bgn, product.old_price_bgn,
-                              discount_pct, now, now, now))
+                        latest_price[store_product_id] = self._insert_price(
+                            cursor, store_product_id, product, discount_pct, now)
                     
                     inserted += 1
             
+            # Updates in three statements; executemany applies them in product order
+            cursor.executemany("""
+                UPDATE store_products SET
+                    store_product_url = COALESCE(?, store_product_url),
+                    store_image_url = COALESCE(?, store_image_url),
+                    package_size = COALESCE(?, package_size),
+                    last_seen_at = ?,
+                    scraped_at = ?,
+                    updated_at = ?
+                WHERE id = ?
+            """, store_product_updates)
+            cursor.executemany("""
+                UPDATE products SET
+                    brand = COALESCE(?, brand),
+                    quantity = COALESCE(?, quantity),
+                    unit = COALESCE(?, unit),
+                    description = COALESCE(?, description),
+                    updated_at = ?
+                WHERE id = ?
+            """, product_updates)
+            cursor.executemany("""
+                UPDATE prices SET
+                    current_price = ?,
+                    old_price = ?,
+                    discount_percent = ?,
+                    currency = 'BGN',
+                    updated_at = ?
+                WHERE id = ?
+            """, price_updates)
+            
             conn.commit()
             logger.info(f"Saved to database: {updated} updated, {inserted} inserted, {skipped} skipped")
         except Exception as e:
@@ -588,6 +894,19 @@ class LidlProductScraper:
         # Delete checkpoint on successful save
         self._delete_checkpoint()
     
+    @staticmethod
+    def _insert_price(cursor: sqlite3.Cursor, store_product_id: int, product: LidlProductData,
+                      discount_pct: Optional[float], now: str) -> int:
+        """Insert a BGN price row; returns its id."""
+        cursor.execute("""
+            INSERT INTO prices (
+                store_product_id, current_price, old_price, discount_percent,
+                currency, valid_from, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, 'BGN', ?, ?, ?)
+        """, (store_product_id, product.price_bgn, product.old_price_bgn,
+              discount_pct, now, now, now))
+        return cursor.lastrowid
+    
     def get_existing_product_urls(self) -> List[str]:
         """Get URLs for products already in database (from store_products table)."""
         with sqlite3.connect(self.db_path) as conn: